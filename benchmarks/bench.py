@@ -0,0 +1,195 @@
+"""
+Benchmarks for the load, slice, export and layer query paths.
+
+    python benchmarks/bench.py --output results.json
+    python benchmarks/bench.py --quick --compare baseline.json
+
+Inputs are generated on the fly (tessellated spheres, gyroid lattices and
+plates of duplicated parts) and written to a temporary directory, so runs
+are reproducible between machines and versions. Every operation is timed
+`repeat` times; the JSON report keeps all timings plus the peak Python
+heap (tracemalloc) and the growth of the process high-water mark (RSS).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import lib3mf
+import numpy as np
+import pyvista as pv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import py3mf_slicer
+from py3mf_slicer import load, slice as slicer, write, get_items
+
+def sphere(resolution):
+    return pv.Sphere(radius=10, center=(0, 0, 10), theta_resolution=resolution, phi_resolution=resolution)
+
+def gyroid(cells, resolution=24, size=20.0, threshold=0.3):
+    """ Solid gyroid lattice of cells^3 unit cells filling a size^3 box """
+    n = cells*resolution+1
+    grid = pv.ImageData(dimensions=(n, n, n), spacing=(size/(n-1),)*3)
+    x, y, z = (grid.points*(2*np.pi*cells/size)).T
+    field = np.sin(x)*np.cos(y)+np.sin(y)*np.cos(z)+np.sin(z)*np.cos(x)-threshold
+    # intersect with the box so the surface is closed
+    inside = np.min(np.stack([grid.points, size-grid.points]), axis=(0, 2))
+    grid["field"] = np.maximum(field, -inside*(2*np.pi*cells/size))
+    return grid.contour([0.0], scalars="field").triangulate().clean()
+
+def plate(count, spacing=12.0):
+    """ count copies of a small cylinder on a square grid """
+    part = pv.Cylinder(radius=5, height=10, center=(0, 0, 5), resolution=48).triangulate()
+    side = int(np.ceil(np.sqrt(count)))
+    return [part.translate(((i % side)*spacing, (i//side)*spacing, 0)) for i in range(count)]
+
+def cases(quick=False):
+    """ (name, params, list of meshes) of every benchmark input """
+    sphere_sizes = (50, 100) if quick else (50, 100, 200, 400)
+    for resolution in sphere_sizes:
+        yield "sphere", {"resolution": resolution}, [sphere(resolution)]
+    for cells in ((1,) if quick else (1, 2)):
+        yield "gyroid", {"cells": cells}, [gyroid(cells)]
+    for count in ((4,) if quick else (4, 16, 64)):
+        yield "plate", {"parts": count}, plate(count)
+
+def measure(function, setup=None, repeat=3):
+    """
+    Timings in seconds and peak memory of function(setup()). The timed
+    runs go without tracemalloc, which slows allocations down; the peak
+    heap comes from one extra traced run.
+    """
+    def call(traced=False):
+        argument = setup() if setup is not None else None
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        function(argument) if setup is not None else function()
+        elapsed = time.perf_counter()-start
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+        return elapsed
+
+    start_rss = _max_rss()
+    times = [call() for _ in range(repeat)]
+    peak_heap = call(traced=True)
+    return {
+        "times": times,
+        "best": min(times),
+        "median": float(np.median(times)),
+        "peak_heap_bytes": peak_heap,
+        "max_rss_growth_bytes": _max_rss()-start_rss,
+    }
+
+def _max_rss():
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss*1024
+
+def run_case(name, params, meshes, directory, layer_height, backends, repeat, queries):
+    paths = []
+    for i, mesh in enumerate(meshes):
+        path = os.path.join(directory, f"{name}_{'_'.join(map(str, params.values()))}_{i}.stl")
+        mesh.save(path)
+        paths.append(path)
+    description = dict(params, triangles=int(sum(mesh.n_cells for mesh in meshes)), files=len(paths))
+
+    def load_model():
+        return load.load_file(paths[0]) if len(paths) == 1 else load.load_files(paths)
+
+    results = []
+    def record(operation, result, **extra):
+        results.append(dict(case=name, params=description, operation=operation, **extra, **result))
+
+    record("load_file", measure(lambda: load.load_file(paths[0]), repeat=repeat))
+    if len(paths) > 1:
+        record("load_files", measure(lambda: load.load_files(paths), repeat=repeat))
+
+    for backend in backends:
+        record("slice_model", measure(lambda model: slicer.slice_model(model, layer_height, backend=backend),
+                                      setup=load_model, repeat=repeat), backend=backend)
+
+    sliced_model = slicer.slice_model(load_model(), layer_height, backend=backends[-1])
+    output = os.path.join(directory, f"{name}.3mf")
+    record("write_file", measure(lambda: write.write_file(sliced_model, output), repeat=repeat))
+
+    layer_count = len(get_items.get_z_table(sliced_model)[0])
+    layers = np.random.default_rng(0).integers(0, max(layer_count, 1), size=queries)
+    def query_layers():
+        for layer in layers:
+            get_items.get_shapely_slice(sliced_model, int(layer))
+    record("get_shapely_slice", measure(query_layers, repeat=repeat), queries=queries, layers=layer_count)
+    record("get_slices", measure(lambda: get_items.get_slices(sliced_model), repeat=repeat), layers=layer_count)
+    return results
+
+def environment():
+    major, minor, micro = lib3mf.get_wrapper().GetLibraryVersion()
+    return {
+        "py3mf_slicer": py3mf_slicer.__version__,
+        "lib3mf": f"{major}.{minor}.{micro}",
+        "numpy": np.__version__,
+        "pyvista": pv.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def compare(results, baseline):
+    """ Print best-time ratios against an earlier report (> 1 is slower) """
+    def key(entry):
+        return (entry["case"], json.dumps(entry["params"], sort_keys=True), entry["operation"], entry.get("backend"))
+    previous = {key(entry): entry for entry in baseline["results"]}
+    for entry in results:
+        old = previous.get(key(entry))
+        if old is None:
+            continue
+        ratio = entry["best"]/old["best"] if old["best"] > 0 else float("inf")
+        label = " ".join(str(v) for v in (entry["case"], *entry["params"].values(), entry["operation"],
+                                          entry.get("backend", "")))
+        print(f"{label:60s} {old['best']:10.4f}s -> {entry['best']:10.4f}s  x{ratio:.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--layer-height", type=float, default=0.1)
+    parser.add_argument("--backends", nargs="+", default=["vtk", "sweep"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=100, help="random layers for get_shapely_slice")
+    parser.add_argument("--quick", action="store_true", help="only the smallest inputs")
+    parser.add_argument("--case", action="append", help="only run these cases (sphere, gyroid, plate)")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, params, meshes in cases(args.quick):
+            if args.case and name not in args.case:
+                continue
+            print(f"{name} {params}", flush=True)
+            results += run_case(name, params, meshes, directory, args.layer_height, args.backends,
+                                args.repeat, args.queries)
+
+    report = {"environment": environment(), "layer_height": args.layer_height, "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
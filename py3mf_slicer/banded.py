@@ -0,0 +1,112 @@
+import numpy as np
+
+from py3mf_slicer.sweep import mesh_z_levels, sweep_slice
+from py3mf_slicer.contours import assemble_contours, expand_ranges
+from py3mf_slicer.buffers import (get_mesh_objects, get_mesh_buffers, append_slice_buffers, stack_from_rings,
+                                  invalidate_layer_index)
+from py3mf_slicer.instrument import DISABLED
+
+# Peak working memory of sweep_slice + assemble_contours + stack_from_rings
+# per cut segment, measured with tracemalloc on tessellated spheres (about
+# 320 bytes per segment plus 96 per triangle, and a band never holds more
+# triangles than segments).
+BYTES_PER_SEGMENT = 416
+
+# The float64 copy of the mesh vertices every band is sliced from
+BYTES_PER_VERTEX = 24
+
+def segment_counts(z_lo, z_hi, z_levels):
+    """ Number of segments every level cuts, from the triangle z extents alone """
+    below = np.searchsorted(np.sort(z_lo), z_levels, side="left")
+    passed = np.searchsorted(np.sort(z_hi), z_levels, side="left")
+    return below-passed
+
+def band_budget(memory_budget, vertex_count):
+    """ Part of memory_budget left for the bands once the float64 vertices are held """
+    return max(memory_budget-BYTES_PER_VERTEX*vertex_count, 0)
+
+def split_bands(segments, memory_budget):
+    """
+    Level ranges [first, last) whose estimated working memory stays below
+    memory_budget. A single level over budget still gets its own band.
+    """
+    cost = np.cumsum(segments*BYTES_PER_SEGMENT)
+    bounds = [0]
+    while bounds[-1] < len(segments):
+        spent = cost[bounds[-1]-1] if bounds[-1] else 0
+        last = int(np.searchsorted(cost, spent+memory_budget, side="right"))
+        bounds.append(max(last, bounds[-1]+1))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def band_triangles(z_lo, z_hi, z_levels, bands):
+    """
+    Triangles cut by any level of every band: returns (triangles,
+    offsets) with the ids of band b in triangles[offsets[b]:offsets[b+1]].
+    """
+    band_of_level = np.repeat(np.arange(len(bands)), [last-first for first, last in bands])
+    first_level = np.searchsorted(z_levels, z_lo, side="right")
+    last_level = np.searchsorted(z_levels, z_hi, side="right")-1
+    cut = np.flatnonzero(last_level >= first_level)
+    first_band = band_of_level[first_level[cut]]
+    counts = band_of_level[last_level[cut]]-first_band+1
+    band = expand_ranges(first_band, counts)
+    order = np.argsort(band, kind="stable")
+    offsets = np.zeros(len(bands)+1, dtype=np.int64)
+    np.cumsum(np.bincount(band, minlength=len(bands)), out=offsets[1:])
+    return np.repeat(cut, counts)[order], offsets
+
+def slice_model_banded(model, layer_height, memory_budget, adaptive=None, instrumentation=DISABLED):
+    """
+    Sweep backend slicing in z-bands with bounded working memory. Every
+    mesh object is split into bands of whole layers whose estimated
+    intersection/contour memory fits memory_budget (bytes, on top of the
+    mesh buffers). The float64 copy of the vertices all bands are sliced
+    from counts against the budget. Only the triangles spanning a band are
+    intersected and the finished layers are appended to the slice stack
+    before the next band starts. The result is identical to
+    slice_model_sweep.
+    """
+    model_sliced = model
+    mesh_objects = get_mesh_objects(model_sliced)
+    for mesh_object in mesh_objects:
+        with instrumentation.stage("meshes"):
+            points, triangles = get_mesh_buffers(mesh_object)
+        if len(points) == 0:
+            continue
+        instrumentation.count("triangles", len(triangles))
+        with instrumentation.stage("z_levels"):
+            z_bottom, z_levels = mesh_z_levels(points, triangles, layer_height, adaptive)
+        if len(z_levels) == 0:
+            continue
+        tri_z = points[triangles, 2]
+        z_lo, z_hi = tri_z.min(axis=1), tri_z.max(axis=1)
+        del tri_z
+        bands = split_bands(segment_counts(z_lo, z_hi, z_levels), band_budget(memory_budget, len(points)))
+        band_tris, band_offsets = band_triangles(z_lo, z_hi, z_levels, bands)
+        del z_lo, z_hi
+        # converted once, sweep_slice would copy the float32 vertices for every band
+        points = points.astype(np.float64)
+
+        slicestack = model_sliced.AddSliceStack(z_bottom)
+        layer_stats = []
+        for b, (first, last) in enumerate(bands):
+            band_z = z_levels[first:last]
+            with instrumentation.stage("slice"):
+                layer_ids, starts, ends = sweep_slice(points, triangles[band_tris[band_offsets[b]:band_offsets[b+1]]],
+                                                      band_z)
+            with instrumentation.stage("contours"):
+                vertices, ring_offsets, ring_layers = assemble_contours(layer_ids, starts, ends)
+            with instrumentation.stage("write"):
+                stack = stack_from_rings(band_z, vertices, ring_offsets, ring_layers)
+                append_slice_buffers(slicestack, stack)
+            if instrumentation.enabled:
+                layer_stats.append((np.bincount(layer_ids, minlength=len(band_z)),
+                                    np.diff(stack["slice_polygon_offsets"]), np.diff(stack["vertex_offsets"])))
+            del layer_ids, starts, ends, vertices, ring_offsets, ring_layers, stack
+        invalidate_layer_index(model_sliced)
+        if instrumentation.enabled:
+            segments, rings, vertex_counts = (np.concatenate(column) for column in zip(*layer_stats))
+            instrumentation.add_stack({"z": z_levels, "slice_polygon_offsets": np.r_[0, np.cumsum(rings)],
+                                       "vertex_offsets": np.r_[0, np.cumsum(vertex_counts)]},
+                                      segments, len(mesh_objects))
+    return model_sliced
@@ -0,0 +1,223 @@
+import ctypes
+import hashlib
+import weakref
+import lib3mf
+import numpy as np
+
+# Bulk access to lib3mf geometry. The lib3mf python binding hands out one
+# ctypes structure per vertex/triangle; these helpers call the same C entry
+# points but let lib3mf copy straight into NumPy buffers.
+
+# One index.LayerIndex per model, dropped together with the model. The slice
+# stack writers below drop it, code adding stacks or slices any other way
+# must call invalidate_layer_index(model).
+_layer_indices = weakref.WeakKeyDictionary()
+
+def invalidate_layer_index(model):
+    _layer_indices.pop(model, None)
+
+def _pointer(array, ctype):
+    return array.ctypes.data_as(ctypes.POINTER(ctype))
+
+def get_mesh_objects(model):
+    mesh_objects = []
+    mesh_iterator = model.GetMeshObjects()
+    while mesh_iterator.MoveNext():
+        mesh_objects.append(mesh_iterator.GetCurrentMeshObject())
+    return mesh_objects
+
+def get_slice_stacks(model):
+    slicestacks = []
+    slice_stack_iterator = model.GetSliceStacks()
+    while slice_stack_iterator.MoveNext():
+        slicestacks.append(slice_stack_iterator.GetCurrentSliceStack())
+    return slicestacks
+
+def get_mesh_buffers(mesh_object):
+    """
+    Vertices and triangles of a lib3mf mesh object as (N, 3) float32 and
+    (M, 3) uint32 arrays.
+    """
+    wrapper = mesh_object._wrapper
+    needed = ctypes.c_uint64(0)
+
+    vertices = np.empty((mesh_object.GetVertexCount(), 3), dtype=np.float32)
+    wrapper.checkError(mesh_object, wrapper.lib.lib3mf_meshobject_getvertices(
+        mesh_object._handle, ctypes.c_uint64(len(vertices)), needed, _pointer(vertices, lib3mf.Position)))
+
+    triangles = np.empty((mesh_object.GetTriangleCount(), 3), dtype=np.uint32)
+    wrapper.checkError(mesh_object, wrapper.lib.lib3mf_meshobject_gettriangleindices(
+        mesh_object._handle, ctypes.c_uint64(len(triangles)), needed, _pointer(triangles, lib3mf.Triangle)))
+    return vertices, triangles
+
+def get_model_mesh_buffers(model):
+    return [get_mesh_buffers(mesh_object) for mesh_object in get_mesh_objects(model)]
+
+def get_slice_buffers(slice):
+    """
+    Vertices and polygons of a lib3mf slice as flat arrays: (V, 2) float32
+    vertices, uint32 vertex indices of all polygons back to back, and
+    polygon offsets so polygon k is indices[offsets[k]:offsets[k+1]].
+    """
+    wrapper = slice._wrapper
+    needed = ctypes.c_uint64(0)
+
+    vertices = np.empty((slice.GetVertexCount(), 2), dtype=np.float32)
+    wrapper.checkError(slice, wrapper.lib.lib3mf_slice_getvertices(
+        slice._handle, ctypes.c_uint64(len(vertices)), needed, _pointer(vertices, lib3mf.Position2D)))
+
+    # lib3mf has no bulk polygon accessor, fill one polygon per call
+    polygon_count = slice.GetPolygonCount()
+    lengths = np.array([slice.GetPolygonIndexCount(k) for k in range(polygon_count)], dtype=np.int64)
+    offsets = np.zeros(polygon_count+1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    indices = np.empty(offsets[-1], dtype=np.uint32)
+    for k in range(polygon_count):
+        wrapper.checkError(slice, wrapper.lib.lib3mf_slice_getpolygonindices(
+            slice._handle, ctypes.c_uint64(k), ctypes.c_uint64(lengths[k]), needed,
+            _pointer(indices[offsets[k]:], ctypes.c_uint32)))
+    return vertices, indices, offsets
+
+def get_slice_stack_buffers(slicestack):
+    """
+    All slices of a lib3mf slice stack as flat arrays. Returns a dict with
+
+    - "z": (L,) z top of every slice
+    - "vertices": (V, 2) float32 vertices of all slices back to back
+    - "vertex_offsets": (L+1,) slice l owns vertices[vertex_offsets[l]:vertex_offsets[l+1]]
+    - "indices": uint32 polygon indices, local to the vertices of their slice
+    - "polygon_offsets": (P+1,) polygon k is indices[polygon_offsets[k]:polygon_offsets[k+1]]
+    - "slice_polygon_offsets": (L+1,) slice l owns polygons slice_polygon_offsets[l] up to l+1
+    """
+    slice_count = slicestack.GetSliceCount()
+    z = np.empty(slice_count, dtype=np.float64)
+    vertices, indices, polygon_lengths = [], [], []
+    vertex_counts = np.zeros(slice_count, dtype=np.int64)
+    polygon_counts = np.zeros(slice_count, dtype=np.int64)
+    for i in range(slice_count):
+        slice = slicestack.GetSlice(i)
+        z[i] = slice.GetZTop()
+        slice_vertices, slice_indices, slice_offsets = get_slice_buffers(slice)
+        vertices.append(slice_vertices)
+        indices.append(slice_indices)
+        polygon_lengths.append(np.diff(slice_offsets))
+        vertex_counts[i] = len(slice_vertices)
+        polygon_counts[i] = len(slice_offsets)-1
+
+    def offsets(counts):
+        out = np.zeros(len(counts)+1, dtype=np.int64)
+        np.cumsum(counts, out=out[1:])
+        return out
+
+    return {
+        "z": z,
+        "vertices": np.concatenate(vertices) if vertices else np.zeros((0, 2), dtype=np.float32),
+        "vertex_offsets": offsets(vertex_counts),
+        "indices": np.concatenate(indices) if indices else np.zeros(0, dtype=np.uint32),
+        "polygon_offsets": offsets(np.concatenate(polygon_lengths) if polygon_lengths else np.zeros(0, dtype=np.int64)),
+        "slice_polygon_offsets": offsets(polygon_counts),
+    }
+
+def set_slice_buffers(slice, vertices, indices, offsets):
+    """
+    Fill an empty lib3mf slice from flat arrays laid out as returned by
+    get_slice_buffers. Vertices are written in one call, every polygon is
+    handed to lib3mf as a pointer into the index buffer.
+    """
+    wrapper = slice._wrapper
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 2)
+    indices = np.ascontiguousarray(indices, dtype=np.uint32)
+    if len(vertices):
+        wrapper.checkError(slice, wrapper.lib.lib3mf_slice_setvertices(
+            slice._handle, ctypes.c_uint64(len(vertices)), _pointer(vertices, lib3mf.Position2D)))
+    new_index = ctypes.c_uint64()
+    for k in range(len(offsets)-1):
+        wrapper.checkError(slice, wrapper.lib.lib3mf_slice_addpolygon(
+            slice._handle, ctypes.c_uint64(offsets[k+1]-offsets[k]),
+            _pointer(indices[offsets[k]:], ctypes.c_uint32), new_index))
+
+def add_slice_stack_buffers(model, stack, z_bottom):
+    """
+    Add a slice stack to the model from a dict laid out as returned by
+    get_slice_stack_buffers and return it.
+    """
+    slicestack = model.AddSliceStack(z_bottom)
+    append_slice_buffers(slicestack, stack)
+    invalidate_layer_index(model)
+    return slicestack
+
+def append_slice_buffers(slicestack, stack):
+    """
+    Add the slices of a get_slice_stack_buffers style dict to the end of
+    an existing slice stack, so a stack can be written in chunks. The
+    slice stack does not know its model, so the caller has to
+    invalidate_layer_index(model).
+    """
+    vertices = np.ascontiguousarray(stack["vertices"], dtype=np.float32)
+    indices = np.ascontiguousarray(stack["indices"], dtype=np.uint32)
+    vertex_offsets = stack["vertex_offsets"]
+    polygon_offsets = stack["polygon_offsets"]
+    slice_polygon_offsets = stack["slice_polygon_offsets"]
+    for i, z in enumerate(stack["z"]):
+        slice = slicestack.AddSlice(float(z))
+        first, last = slice_polygon_offsets[i], slice_polygon_offsets[i+1]
+        set_slice_buffers(slice, vertices[vertex_offsets[i]:vertex_offsets[i+1]],
+                          indices, polygon_offsets[first:last+1])
+
+def stack_from_rings(z, vertices, ring_offsets, ring_layers):
+    """
+    Slice stack dict (see get_slice_stack_buffers) for rings as returned by
+    contours.assemble_contours. Every layer of z gets a slice, layers
+    without rings stay empty.
+    """
+    layer_rings = np.searchsorted(ring_layers, np.arange(len(z)+1))
+    vertex_offsets = ring_offsets[layer_rings]
+    local = np.arange(ring_offsets[-1])-np.repeat(vertex_offsets[:-1], np.diff(vertex_offsets))
+    return {
+        "z": np.asarray(z, dtype=np.float64),
+        "vertices": np.asarray(vertices, dtype=np.float32),
+        "vertex_offsets": vertex_offsets,
+        "indices": local.astype(np.uint32),
+        "polygon_offsets": ring_offsets,
+        "slice_polygon_offsets": layer_rings,
+    }
+
+def set_mesh_buffers(mesh_object, vertices, triangles):
+    """
+    Replace the geometry of a lib3mf mesh object with (N, 3) vertices and
+    (M, 3) triangle indices in a single SetGeometry call.
+    """
+    wrapper = mesh_object._wrapper
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    triangles = np.ascontiguousarray(triangles, dtype=np.uint32).reshape(-1, 3)
+    wrapper.checkError(mesh_object, wrapper.lib.lib3mf_meshobject_setgeometry(
+        mesh_object._handle, ctypes.c_uint64(len(vertices)), _pointer(vertices, lib3mf.Position),
+        ctypes.c_uint64(len(triangles)), _pointer(triangles, lib3mf.Triangle)))
+
+def get_build_items(model):
+    build_items = []
+    build_item_iterator = model.GetBuildItems()
+    while build_item_iterator.MoveNext():
+        build_items.append(build_item_iterator.GetCurrent())
+    return build_items
+
+def transform_to_array(transform):
+    # lib3mf 4x3 matrix, rows are x, y, z axes and the translation
+    return np.array([list(row) for row in transform.Fields], dtype=np.float64)
+
+def array_to_transform(matrix):
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(4, 3)
+    transform = lib3mf.Transform()
+    for i in range(4):
+        for j in range(3):
+            transform.Fields[i][j] = matrix[i, j]
+    return transform
+
+def object_key(vertices, triangles, transforms=()):
+    """ Change tracking key of a mesh object: its geometry plus its build transforms """
+    digest = hashlib.blake2b(digest_size=20)
+    for array in (vertices, triangles, *transforms):
+        array = np.ascontiguousarray(array)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
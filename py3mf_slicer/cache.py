@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import lib3mf
+import numpy as np
+
+import py3mf_slicer
+from py3mf_slicer import load, slice as slicer
+from py3mf_slicer.buffers import (get_mesh_objects, get_mesh_buffers, set_mesh_buffers, get_build_items,
+                                  transform_to_array, array_to_transform, get_slice_stacks,
+                                  get_slice_stack_buffers, add_slice_stack_buffers)
+
+# Entries are single .npz files named by their key. Writers publish through
+# os.replace of a private temp file and readers only ever see complete
+# files, so several processes can share one cache directory without locks.
+# LRU order is the file mtime, refreshed on every hit.
+
+_STACK_KEYS = ("z", "vertices", "vertex_offsets", "indices", "polygon_offsets", "slice_polygon_offsets")
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def model_to_arrays(model):
+    """ Meshes, build items and slice stacks of a model as a flat dict of arrays """
+    arrays = {}
+    mesh_objects = get_mesh_objects(model)
+    mesh_ids = {}
+    for i, mesh_object in enumerate(mesh_objects):
+        arrays[f"mesh{i}_vertices"], arrays[f"mesh{i}_triangles"] = get_mesh_buffers(mesh_object)
+        mesh_ids[mesh_object.GetUniqueResourceID()] = i
+    items, transforms = [], []
+    for build_item in get_build_items(model):
+        resource_id = build_item.GetObjectResource().GetUniqueResourceID()
+        if resource_id in mesh_ids:
+            items.append(mesh_ids[resource_id])
+            transforms.append(transform_to_array(build_item.GetObjectTransform()))
+    arrays["build_items"] = np.array(items, dtype=np.int64)
+    arrays["build_transforms"] = np.array(transforms, dtype=np.float64).reshape(-1, 4, 3)
+    slicestacks = get_slice_stacks(model)
+    arrays["stack_bottoms"] = np.array([s.GetBottomZ() for s in slicestacks], dtype=np.float64)
+    for i, slicestack in enumerate(slicestacks):
+        for key, value in get_slice_stack_buffers(slicestack).items():
+            arrays[f"stack{i}_{key}"] = value
+    arrays["mesh_count"] = np.array(len(mesh_objects))
+    return arrays
+
+def model_from_arrays(arrays):
+    """ Rebuild a lib3mf model from the output of model_to_arrays """
+    model = lib3mf.get_wrapper().CreateModel()
+    mesh_objects = []
+    for i in range(int(arrays["mesh_count"])):
+        mesh_object = model.AddMeshObject()
+        set_mesh_buffers(mesh_object, arrays[f"mesh{i}_vertices"], arrays[f"mesh{i}_triangles"])
+        mesh_objects.append(mesh_object)
+    for item, transform in zip(arrays["build_items"], arrays["build_transforms"]):
+        model.AddBuildItem(mesh_objects[item], array_to_transform(transform))
+    for i, z_bottom in enumerate(arrays["stack_bottoms"]):
+        stack = {key: arrays[f"stack{i}_{key}"] for key in _STACK_KEYS}
+        add_slice_stack_buffers(model, stack, float(z_bottom))
+    return model
+
+class SliceCache:
+    """
+    Size bounded, content addressed on-disk cache of sliced models.
+
+    Keys combine the hash of the input files with the slicing parameters
+    and the py3mf_slicer/lib3mf versions. When the directory grows past
+    max_bytes the least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_bytes=4*1024**3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, paths, **params):
+        major, minor, micro = lib3mf.get_wrapper().GetLibraryVersion()
+        description = {
+            "files": [file_hash(path) for path in paths],
+            "params": params,
+            "version": py3mf_slicer.__version__,
+            "lib3mf": f"{major}.{minor}.{micro}",
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key+".npz")
+
+    def get(self, key):
+        """ Cached arrays for key, or None on a miss """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError):
+            # Unreadable entry (e.g. removed while reading); treat as a miss
+            return None
+        return arrays
+
+    def put(self, key, arrays):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".npz"):
+                entries.append((stat.st_mtime, stat.st_size, path))
+            elif name.endswith(".tmp") and stat.st_mtime < time.time()-24*3600:
+                # left behind by a writer that died
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # already gone, or still open by a reader on Windows
+                continue
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+def load_and_slice(paths, layer_height, *, backend="vtk", workers=None, cache=None):
+    """
+    load.load_file/load_files followed by slice.slice_model. With a
+    SliceCache a hit returns the stored model without parsing or slicing.
+    """
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    key = None
+    if cache is not None:
+        key = cache.key(paths, layer_height=layer_height, backend=backend)
+        arrays = cache.get(key)
+        if arrays is not None:
+            return model_from_arrays(arrays)
+
+    model = load.load_file(paths[0]) if len(paths) == 1 else load.load_files(paths)
+    if model is None:
+        return None
+    model = slicer.slice_model(model, layer_height, backend=backend, workers=workers)
+    if cache is not None:
+        cache.put(key, model_to_arrays(model))
+    return model
@@ -0,0 +1,145 @@
+import json
+import os
+import lib3mf
+import numpy as np
+
+from py3mf_slicer.buffers import get_slice_stacks, get_slice_stack_buffers, add_slice_stack_buffers
+from py3mf_slicer.index import stack_layer_height, layer_table
+
+# A sliced model as a handful of flat arrays. Slices of all stacks are
+# numbered globally (stack after stack):
+#   vertices             (V, 2) float32, all slice vertices back to back
+#   slice_vertex_offsets (S+1,) vertices of slice s
+#   indices              (I,)   uint32 polygon indices, local to their slice
+#   ring_offsets         (R+1,) indices of polygon ring r
+#   slice_ring_offsets   (S+1,) rings of slice s
+#   z                    (S,)   float64 z top of slice s
+#   stack_slice_offsets  (T+1,) slices of stack t
+#   stack_bottoms        (T,)   float64 bottom z of stack t
+# On disk every array is one .npy file in a directory, so np.load with
+# mmap_mode only pages in the parts that are actually read.
+
+FORMAT_VERSION = 1
+COLUMNS = ("vertices", "slice_vertex_offsets", "indices", "ring_offsets", "slice_ring_offsets", "z",
+           "stack_slice_offsets", "stack_bottoms")
+
+class SliceColumns:
+    """ Columnar copy of the slice stacks of a model, see the layout above """
+
+    def __init__(self, arrays):
+        missing = [name for name in COLUMNS if name not in arrays]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        self.arrays = arrays
+        self._layers = None
+
+    @classmethod
+    def from_stacks(cls, stacks, bottoms):
+        """ From stack dicts in the buffers.get_slice_stack_buffers layout """
+        def chain(offsets):
+            # concatenate per stack offset arrays into one running array
+            shifts = np.cumsum([0]+[o[-1] for o in offsets[:-1]])
+            return np.concatenate([[0]]+[o[1:]+shift for o, shift in zip(offsets, shifts)]).astype(np.int64)
+
+        stacks = list(stacks)
+        arrays = {
+            "vertices": np.concatenate([s["vertices"] for s in stacks]+[np.zeros((0, 2))]).astype(np.float32),
+            "slice_vertex_offsets": chain([s["vertex_offsets"] for s in stacks]),
+            "indices": np.concatenate([s["indices"] for s in stacks]+[np.zeros(0)]).astype(np.uint32),
+            "ring_offsets": chain([s["polygon_offsets"] for s in stacks]),
+            "slice_ring_offsets": chain([s["slice_polygon_offsets"] for s in stacks]),
+            "z": np.concatenate([s["z"] for s in stacks]+[np.zeros(0)]).astype(np.float64),
+            "stack_slice_offsets": np.cumsum([0]+[len(s["z"]) for s in stacks]).astype(np.int64),
+            "stack_bottoms": np.asarray(bottoms, dtype=np.float64),
+        }
+        return cls(arrays)
+
+    @classmethod
+    def from_model(cls, model):
+        slicestacks = get_slice_stacks(model)
+        return cls.from_stacks([get_slice_stack_buffers(s) for s in slicestacks],
+                               [s.GetBottomZ() for s in slicestacks])
+
+    def to_model(self, model=None):
+        """ Add the slice stacks to model (a new empty lib3mf model by default) """
+        if model is None:
+            model = lib3mf.get_wrapper().CreateModel()
+        for i in range(self.stack_count):
+            add_slice_stack_buffers(model, self.stack(i), float(self.arrays["stack_bottoms"][i]))
+        return model
+
+    @property
+    def stack_count(self):
+        return len(self.arrays["stack_bottoms"])
+
+    def stack(self, i):
+        """ Stack i as a buffers.get_slice_stack_buffers style dict """
+        a = self.arrays
+        first, last = a["stack_slice_offsets"][i:i+2]
+        vertex_offsets = np.asarray(a["slice_vertex_offsets"][first:last+1])
+        slice_ring_offsets = np.asarray(a["slice_ring_offsets"][first:last+1])
+        ring_offsets = np.asarray(a["ring_offsets"][slice_ring_offsets[0]:slice_ring_offsets[-1]+1])
+        return {
+            "z": np.asarray(a["z"][first:last]),
+            "vertices": a["vertices"][vertex_offsets[0]:vertex_offsets[-1]],
+            "vertex_offsets": vertex_offsets-vertex_offsets[0],
+            "indices": a["indices"][ring_offsets[0]:ring_offsets[-1]],
+            "polygon_offsets": ring_offsets-ring_offsets[0],
+            "slice_polygon_offsets": slice_ring_offsets-slice_ring_offsets[0],
+        }
+
+    def get_slice_buffers(self, stack, k):
+        """ (vertices, indices, offsets) of slice k of a stack, as buffers.get_slice_buffers """
+        a = self.arrays
+        s = int(a["stack_slice_offsets"][stack])+k
+        rings = a["ring_offsets"][a["slice_ring_offsets"][s]:a["slice_ring_offsets"][s+1]+1]
+        vertices = a["vertices"][a["slice_vertex_offsets"][s]:a["slice_vertex_offsets"][s+1]]
+        return np.asarray(vertices), np.asarray(a["indices"][rings[0]:rings[-1]]), np.asarray(rings)-rings[0]
+
+    def _layer_table(self):
+        if self._layers is None:
+            offsets = self.arrays["stack_slice_offsets"]
+            stack_z = [np.asarray(self.arrays["z"][offsets[i]:offsets[i+1]]) for i in range(self.stack_count)]
+            z_table, stack_layers = layer_table(stack_z, stack_layer_height(stack_z))
+            self._layers = (z_table, stack_layers)
+        return self._layers
+
+    @property
+    def z_table(self):
+        """ Global layer z tops, numbered like get_items.get_z_table """
+        return self._layer_table()[0]
+
+    def get_layer(self, layer):
+        """ Slice buffers (or None) of every stack on a global layer """
+        _, stack_layers = self._layer_table()
+        result = []
+        for stack, layers in enumerate(stack_layers):
+            k = int(np.searchsorted(layers, layer))
+            result.append(self.get_slice_buffers(stack, k) if k < len(layers) and layers[k] == layer else None)
+        return result
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in COLUMNS:
+            np.save(os.path.join(directory, name+".npy"), np.ascontiguousarray(self.arrays[name]))
+        # written last, so a directory with a meta file is complete
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"format": "py3mf_slicer.columnar", "version": FORMAT_VERSION}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version {meta.get('version')}")
+        mode = "r" if mmap else None
+        return cls({name: np.load(os.path.join(directory, name+".npy"), mmap_mode=mode) for name in COLUMNS})
+
+def save_slices(model, directory):
+    """ Write the slice stacks of a model as a columnar directory """
+    columns = SliceColumns.from_model(model)
+    columns.save(directory)
+    return columns
+
+def load_slices(directory, mmap=True):
+    return SliceColumns.load(directory, mmap=mmap)
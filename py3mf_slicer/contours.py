@@ -0,0 +1,260 @@
+import numpy as np
+
+def _group_rank(sorted_keys):
+    # Position of every element inside its run of equal keys
+    idx = np.arange(len(sorted_keys))
+    if len(sorted_keys) == 0:
+        return idx
+    run_start = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    return idx - np.maximum.accumulate(np.where(run_start, idx, 0))
+
+def ragged_arange(counts):
+    """ 0, 1, ..., counts[i]-1 for every i, back to back """
+    counts = np.asarray(counts, dtype=np.int64)
+    return np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts, counts)
+
+def expand_ranges(first, counts):
+    """ first[i], first[i]+1, ..., first[i]+counts[i]-1 for every i, back to back """
+    return np.repeat(first, counts)+ragged_arange(counts)
+
+def _take_rings(ring_offsets, rings):
+    # Flat positions of the listed rings, in the given ring order
+    lengths = np.diff(ring_offsets)[rings]
+    return expand_ranges(ring_offsets[:-1][rings], lengths), np.append(0, np.cumsum(lengths)).astype(np.int64)
+
+def _doubling_steps(n):
+    return max(1, int(np.ceil(np.log2(n+1))))
+
+def extract_cycles(nxt):
+    """
+    Split an injective next-pointer array into its cycles by pointer jumping.
+    nxt[i] is the successor of node i or -1 when it has none; nodes on open
+    chains are dropped.
+
+    Returns (nodes, offsets): cycle k is nodes[offsets[k]:offsets[k+1]],
+    starting at its smallest node and following nxt. Cycles are ordered by
+    their smallest node.
+    """
+    n = len(nxt)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    sentinel = n
+    nxt = np.append(np.where(np.asarray(nxt) < 0, sentinel, nxt), sentinel).astype(np.int64)
+    steps = _doubling_steps(n)
+
+    # After >= n jumps every open chain has run into the sentinel
+    far = nxt
+    for _ in range(steps):
+        far = far[far]
+    on_cycle = far != sentinel
+
+    # Smallest node on each cycle becomes its label and root
+    label = np.where(on_cycle, np.arange(n+1), sentinel)
+    jump = nxt
+    for _ in range(steps):
+        label = np.minimum(label, label[jump])
+        jump = jump[jump]
+
+    # Cut every cycle in front of its root and rank the nodes by list ranking
+    cut = np.where(on_cycle & (nxt != label), nxt, sentinel)
+    cut[sentinel] = sentinel
+    dist = (cut != sentinel).astype(np.int64)
+    for _ in range(steps):
+        dist = dist+dist[cut]
+        cut = cut[cut]
+
+    nodes = np.flatnonzero(on_cycle[:n])
+    nodes = nodes[np.lexsort((-dist[nodes], label[nodes]))]
+    labels = label[nodes]
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) if len(nodes) else np.zeros(0, dtype=np.int64)
+    offsets = np.append(starts, len(nodes)).astype(np.int64)
+    return nodes, offsets
+
+def _directed_next(a, b):
+    # Pair the k-th segment ending in a point with the k-th segment starting there
+    n = len(a)
+    out_order = np.argsort(a, kind="stable")
+    in_order = np.argsort(b, kind="stable")
+    out_key = a[out_order]*(n+1)+_group_rank(a[out_order])
+    in_key = b[in_order]*(n+1)+_group_rank(b[in_order])
+    pos = np.minimum(np.searchsorted(out_key, in_key), max(n-1, 0))
+    found = out_key[pos] == in_key
+    nxt = np.full(n, -1, dtype=np.int64)
+    nxt[in_order[found]] = out_order[pos[found]]
+    return nxt
+
+def _undirected_next(a, b):
+    # Half-edge 2*i runs a[i] -> b[i], 2*i+1 runs b[i] -> a[i]. Segment ends
+    # meeting in a point are paired up and a half-edge continues through the
+    # partner of the end it arrives at.
+    n = len(a)
+    point = np.stack((a, b), axis=1).ravel()
+    order = np.argsort(point, kind="stable")
+    keys = point[order]
+    rank = _group_rank(keys)
+    pos = np.arange(2*n)
+    partner_pos = np.where(rank % 2 == 0, pos+1, pos-1)
+    valid = (partner_pos < 2*n) & (keys[np.minimum(partner_pos, 2*n-1)] == keys)
+    partner = np.full(2*n, -1, dtype=np.int64)
+    partner[order[valid]] = order[partner_pos[valid]]
+    return partner[pos ^ 1]
+
+def chain_segments(a, b, directed=True):
+    """
+    Chain segments between point ids a[i] -> b[i] into closed rings.
+
+    Directed segments keep their direction, so the rings keep the orientation
+    of the input. Undirected segments (e.g. VTK cutter lines) may be walked
+    either way. Open chains are dropped.
+
+    Returns (ring_points, ring_offsets) where ring k visits the point ids
+    ring_points[ring_offsets[k]:ring_offsets[k+1]] without repeating the
+    first one at the end.
+    """
+    a = np.asarray(a, dtype=np.int64).ravel()
+    b = np.asarray(b, dtype=np.int64).ravel()
+    if len(a) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    if directed:
+        nodes, offsets = extract_cycles(_directed_next(a, b))
+        return a[nodes], offsets
+
+    # Every ring shows up twice, once per direction; the copy holding the
+    # forward half-edge of its lowest segment has an even smallest node.
+    nodes, offsets = extract_cycles(_undirected_next(a, b))
+    take, offsets = _take_rings(offsets, np.flatnonzero(nodes[offsets[:-1]] % 2 == 0))
+    nodes = nodes[take]
+    points = np.where(nodes % 2 == 0, a[nodes//2], b[nodes//2])
+    return points, offsets
+
+def ring_areas(vertices, ring_offsets):
+    """ Signed area of every ring (positive for counter clockwise) """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    if len(ring_offsets) < 2:
+        return np.zeros(0)
+    ring_id = np.repeat(np.arange(len(ring_offsets)-1), np.diff(ring_offsets))
+    following = np.arange(len(vertices))+1
+    ends = ring_offsets[1:]-1
+    following[ends] = ring_offsets[:-1]
+    x, y = vertices[:, 0], vertices[:, 1]
+    cross = x*y[following]-x[following]*y
+    return 0.5*np.bincount(ring_id, weights=cross, minlength=len(ring_offsets)-1)
+
+def reverse_rings(ring_offsets, flip):
+    """ Flat positions that walk the rings with flip set backwards and the others forwards """
+    lengths = np.diff(ring_offsets)
+    ring_id = np.repeat(np.arange(len(lengths)), lengths)
+    local = ragged_arange(lengths)
+    return np.where(flip[ring_id], ring_offsets[ring_id+1]-1-local, ring_offsets[ring_id]+local)
+
+def orient_rings(ring_points, ring_offsets, vertices, ccw=True):
+    """ Reverse rings whose winding does not match ccw; returns new ring_points """
+    ring_points = np.asarray(ring_points)
+    areas = ring_areas(np.asarray(vertices)[ring_points], ring_offsets)
+    return ring_points[reverse_rings(ring_offsets, (areas < 0) if ccw else (areas > 0))]
+
+def ring_nesting_odd(vertices, ring_offsets, ring_layers):
+    """
+    True for the rings lying inside an odd number of other rings of their
+    layer (holes, islands in holes are even again). A ray is cast from the
+    first point of every ring towards +x and the crossings with the edges
+    of the other rings on its layer are counted.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    ring_count = len(ring_offsets)-1
+    if ring_count < 1:
+        return np.zeros(0, dtype=bool)
+    lengths = np.diff(ring_offsets)
+    edge_ring = np.repeat(np.arange(ring_count), lengths)
+    following = np.arange(len(vertices))+1
+    following[ring_offsets[1:]-1] = ring_offsets[:-1]
+    start, end = vertices, vertices[following]
+    query = vertices[ring_offsets[:-1]]
+
+    # an edge crosses the rays of the rings on its layer with low <= y < high,
+    # found by rank keys sorted per layer
+    low, high = np.minimum(start[:, 1], end[:, 1]), np.maximum(start[:, 1], end[:, 1])
+    _, ranks = np.unique(np.concatenate((query[:, 1], low, high)), return_inverse=True)
+    ranks = ranks.ravel().astype(np.int64)
+    width = ranks.max()+1
+    layers = np.asarray(ring_layers, dtype=np.int64)
+    query_keys = layers*width+ranks[:ring_count]
+    order = np.argsort(query_keys, kind="stable")
+    edge_layers = layers[edge_ring]*width
+    first = np.searchsorted(query_keys[order], edge_layers+ranks[ring_count:ring_count+len(low)])
+    last = np.searchsorted(query_keys[order], edge_layers+ranks[ring_count+len(low):])
+    counts = last-first
+    edges = np.repeat(np.arange(len(low)), counts)
+    rings = order[expand_ranges(first, counts)]
+    other = edge_ring[edges] != rings
+    edges, rings = edges[other], rings[other]
+
+    x0, y0 = start[edges, 0], start[edges, 1]
+    x1, y1 = end[edges, 0], end[edges, 1]
+    qx, qy = query[rings, 0], query[rings, 1]
+    crossing = x0+(qy-y0)*(x1-x0)/(y1-y0) > qx
+    return np.bincount(rings[crossing], minlength=ring_count) % 2 == 1
+
+def orient_nested_rings(ring_points, ring_offsets, vertices, ring_layers):
+    """
+    Orient rings by their nesting depth within their layer: outer contours
+    (even depth) counter clockwise, holes (odd depth) clockwise, as
+    sweep.sweep_slice produces them. Returns new ring_points.
+    """
+    ring_points = np.asarray(ring_points)
+    ring_vertices = np.asarray(vertices)[ring_points]
+    areas = ring_areas(ring_vertices, ring_offsets)
+    holes = ring_nesting_odd(ring_vertices, ring_offsets, ring_layers)
+    return ring_points[reverse_rings(ring_offsets, (areas < 0) != holes)]
+
+def drop_closing_points(coordinates, ring_index, ring_count):
+    """
+    Ring coordinates from shapely.get_coordinates(rings, return_index=True)
+    without the repeated closing point of every ring. Returns (vertices,
+    ring_offsets); rings without coordinates (None, empty) stay empty.
+    """
+    ring_index = np.asarray(ring_index)
+    keep = np.r_[ring_index[1:] == ring_index[:-1], False][:len(ring_index)]
+    lengths = np.bincount(ring_index[keep], minlength=ring_count)
+    return coordinates[keep], np.r_[0, np.cumsum(lengths)].astype(np.int64)
+
+def merge_endpoints(layer_ids, starts, ends, tol=1e-9):
+    """
+    Give coincident segment endpoints on the same layer a shared point id by
+    hashing them onto a tol sized grid. Returns (points, point_layers, a, b).
+    """
+    n = len(starts)
+    endpoints = np.concatenate((starts, ends))
+    layers = np.concatenate((layer_ids, layer_ids)).astype(np.int64)
+    keys = np.column_stack((layers, np.round(endpoints/tol).astype(np.int64)))
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    return endpoints[first], layers[first], inverse[:n], inverse[n:]
+
+def assemble_contours(layer_ids, starts, ends, tol=1e-9, directed=True):
+    """
+    Assemble plane/mesh intersection segments of a whole slice stack into
+    closed rings in one batch.
+
+    layer_ids gives the layer of each segment and starts/ends its (S, 2)
+    endpoints. Directed input (as produced by sweep.sweep_slice) keeps the
+    mesh orientation, undirected input is oriented by nesting depth (outer
+    contours counter clockwise, holes clockwise).
+
+    Returns (vertices, ring_offsets, ring_layers): ring k has the xy points
+    vertices[ring_offsets[k]:ring_offsets[k+1]] and lies on layer
+    ring_layers[k]. Rings are sorted by layer and have at least 3 points.
+    """
+    if len(starts) == 0:
+        return np.zeros((0, 2)), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    points, point_layers, a, b = merge_endpoints(layer_ids, starts, ends, tol)
+    ring_points, ring_offsets = chain_segments(a, b, directed=directed)
+    take, ring_offsets = _take_rings(ring_offsets, np.flatnonzero(np.diff(ring_offsets) >= 3))
+    ring_points = ring_points[take]
+    # Rings are grouped by smallest point id; reorder them by layer
+    ring_layers = point_layers[ring_points[ring_offsets[:-1]]]
+    if not directed:
+        ring_points = orient_nested_rings(ring_points, ring_offsets, points, ring_layers)
+    order = np.argsort(ring_layers, kind="stable")
+    take, ring_offsets = _take_rings(ring_offsets, order)
+    return points[ring_points[take]], ring_offsets, ring_layers[order]
@@ -4,11 +4,15 @@ from __future__ import annotations
 import lib3mf
 import numpy as np
 import pyvista as pv
-from ctypes import c_float, c_uint32
+from ctypes import c_float
 import shapely
 from typing import Iterable, List, Tuple, Optional, Callable, Union, Dict
 from shapely.geometry import Polygon, MultiPolygon
 from shapely.ops import unary_union
+from py3mf_slicer.buffers import (get_mesh_objects, get_mesh_buffers, set_mesh_buffers, get_slice_stacks, get_slice_buffers,
+                                  get_slice_stack_buffers)
+from py3mf_slicer.index import get_layer_index
+from py3mf_slicer.contours import expand_ranges, drop_closing_points
 
 def to_lib3mf_position2D(positions):
     lib3mf_positions = []
@@ -18,307 +22,284 @@ def to_lib3mf_position2D(positions):
     return lib3mf_positions
 
 def get_vertexs(model):
-    matrix = []
-    mesh_iterator = model.GetMeshObjects()
-    
-    while mesh_iterator.MoveNext():
-        vertex_matrix = []
-        mesh_object = mesh_iterator.GetCurrentMeshObject()
-        vertices = mesh_object.GetVertices()
-        
-        for vertex in vertices:
-            coordinates = vertex.Coordinates
-            vertex_matrix.append([coordinates[0], coordinates[1], coordinates[2]])
-        matrix.append(vertex_matrix)
-    return matrix
+    # (N, 3) float32 vertex array per mesh object
+    return [get_mesh_buffers(mesh_object)[0] for mesh_object in get_mesh_objects(model)]
 
 def get_bounding_boxes(model):
     matrices = get_vertexs(model)
     boundries = []
-    for matrix in matrices:
-        m = np.array(matrix)
+    for m in matrices:
         min_values = np.min(m, axis=0)
         max_values = np.max(m, axis=0)
         boundries.append([max_values.tolist(), min_values.tolist()])
     return boundries
 
 def get_layer_height(model):
-    slice_stack_iterator = model.GetSliceStacks()
-    while slice_stack_iterator.MoveNext():
-        slicestack = slice_stack_iterator.GetCurrentSliceStack()
-        slice_count = slicestack.GetSliceCount()
-        z_min = slicestack.GetSlice(0).GetZTop()
-        z_max = slicestack.GetSlice(slice_count-1).GetZTop()
-        if slice_count > 1:
-            layer_height = (z_max-z_min)/(slice_count-1)
-        else:
-            layer_height = z_min
-        return layer_height
-    return 0
+    # Mean spacing of the first slice stack; see get_layer_heights for adaptive models
+    return get_layer_index(model).layer_height
+
+def get_layer_heights(model):
+    # Per layer thickness, not constant for adaptively sliced models
+    return get_layer_index(model).layer_heights
 
 def get_layer_z_height(model, layer_nmb):
-    slice_stack_iterator = model.GetSliceStacks()
-    while slice_stack_iterator.MoveNext():
-        slicestack = slice_stack_iterator.GetCurrentSliceStack()
-        slice_count = slicestack.GetSliceCount()
-        if layer_nmb < slice_count:
-            z_height = slicestack.GetSlice(layer_nmb).GetZTop()
-            return z_height
+    z_table = get_layer_index(model).z_table
+    if 0 <= layer_nmb < len(z_table):
+        return float(z_table[layer_nmb])
     return 0
 
 def get_pyvista_meshes(model):
     pv_meshes = []
-    mesh_iterator = model.GetMeshObjects()
-    while mesh_iterator.MoveNext():
-        mesh_object = mesh_iterator.GetCurrentMeshObject()
-        # Extract vertices
-        vertices = mesh_object.GetVertices()
-        points = [(vertex.Coordinates[0], vertex.Coordinates[1], vertex.Coordinates[2]) for vertex in vertices]
-        # Extract faces
-        triangles = mesh_object.GetTriangleIndices()
-        faces = []
-        for triangle in triangles:
-            faces.append([3, triangle.Indices[0], triangle.Indices[1], triangle.Indices[2]])
-        # Create pyvista mesh
-        pv_meshes.append(pv.PolyData(points, faces))
+    for mesh_object in get_mesh_objects(model):
+        points, triangles = get_mesh_buffers(mesh_object)
+        # float64 like the per vertex accessors, VTK cuts in the point precision
+        points = points.astype(np.float64)
+        # VTK cell layout: [3, i0, i1, i2] per triangle
+        faces = np.empty((len(triangles), 4), dtype=np.int64)
+        faces[:, 0] = 3
+        faces[:, 1:] = triangles
+        pv_meshes.append(pv.PolyData(points, faces.ravel()))
     return pv_meshes
 
-def get_pyvista_slices(model):
-    slice_stack_iterator = model.GetSliceStacks()
+def get_pyvista_slices(model, merged=False, layer_stride=1, layer_range=None, decimate=None):
+    # merged=True returns one PolyData per slice stack instead of a
+    # MultiBlock with one PolyData per polygon, see slice_stack_to_pyvista.
+    # layer_stride, layer_range and decimate only apply to merged output.
+    if merged:
+        index = get_layer_index(model)
+        return [slice_stack_to_pyvista(get_slice_stack_buffers(slicestack), index.stack_layers[s],
+                                       layer_stride=layer_stride, layer_range=layer_range, decimate=decimate)
+                for s, slicestack in enumerate(index.slicestacks)]
     slices = []
-    while slice_stack_iterator.MoveNext():
-        slicestack = slice_stack_iterator.GetCurrentSliceStack()
+    for slicestack in get_slice_stacks(model):
         multiblock = pv.MultiBlock()
 
         for i in range(slicestack.GetSliceCount()):
             slice = slicestack.GetSlice(i)
-            vertices = []
-            vertices_list = slice.GetVertices()
-            z_top = slicestack.GetSlice(i).GetZTop()
-            vertices = [[vertex.Coordinates[0], vertex.Coordinates[1], z_top] for vertex in vertices_list]
-            
-            polygons = []
-            for k in range(slice.GetPolygonCount()):
-                polygon = slice.GetPolygonIndices(k)
-                newlst = []
-                for i in range(len(polygon)-1):
-                    newlst.append(2)
-                    newlst.append(polygon[i])
-                    newlst.append(polygon[i+1])
-                newlst.append(2)
-                newlst.append(polygon[-1])
-                newlst.append(polygon[0])
-                polydata = pv.PolyData(vertices, lines=np.array(newlst))
+            z_top = slice.GetZTop()
+            for polydata in slice_buffers_to_pyvista(z_top, *get_slice_buffers(slice)):
                 multiblock.append(polydata)
-            
+
         slices.append(multiblock)
     return slices
 
-def get_py3mf_from_pyvista(pyvista_meshes):
+def slice_buffers_to_pyvista(z_top, vertices_2d, indices, offsets):
+    # One closed polyline PolyData per polygon of a slice
+    vertices = np.column_stack((vertices_2d, np.full(len(vertices_2d), z_top, dtype=np.float32)))
+    polydatas = []
+    for k in range(len(offsets)-1):
+        polygon = indices[offsets[k]:offsets[k+1]]
+        # Closed polyline as [2, p_i, p_i+1] line cells
+        lines = np.empty((len(polygon), 3), dtype=np.int64)
+        lines[:, 0] = 2
+        lines[:, 1] = polygon
+        lines[:, 2] = np.roll(polygon, -1)
+        polydatas.append(pv.PolyData(vertices, lines=lines.ravel()))
+    return polydatas
+
+def slice_stack_to_pyvista(stack, layers=None, layer_stride=1, layer_range=None, decimate=None):
+    """
+    One PolyData for a whole slice stack (buffers.get_slice_stack_buffers
+    layout): every used vertex once, each polygon as closed [2, a, b] line
+    cells and the cell arrays "polygon_id" and "layer_id". layers are the
+    global layer numbers of the slices (slice index when None).
+
+    Level of detail: only every layer_stride-th layer inside layer_range
+    (first, last) is kept, and decimate simplifies the contours with that
+    tolerance (shapely.simplify).
+    """
+    slice_count = len(stack["z"])
+    layers = np.arange(slice_count) if layers is None else np.asarray(layers)
+    first, last = layer_range if layer_range is not None else (layers.min(initial=0), layers.max(initial=0)+1)
+    keep_slice = (layers >= first) & (layers < last) & ((layers-first) % layer_stride == 0)
+
+    ring_lengths = np.diff(stack["polygon_offsets"])
+    ring_slices = np.repeat(np.arange(slice_count), np.diff(stack["slice_polygon_offsets"]))
+    rings = np.flatnonzero(keep_slice[ring_slices] & (ring_lengths >= 2))
+    lengths = ring_lengths[rings]
+    positions = expand_ranges(stack["polygon_offsets"][rings], lengths)
+    point_slices = np.repeat(ring_slices[rings], lengths)
+    points_2d = stack["vertices"][stack["indices"][positions].astype(np.int64)+stack["vertex_offsets"][point_slices]]
+
+    ring_id = np.repeat(np.arange(len(rings)), lengths)
+    if decimate and len(rings):
+        simplified = shapely.simplify(shapely.linearrings(points_2d.astype(np.float64), indices=ring_id), decimate)
+        simplified[shapely.is_empty(simplified)] = None
+        points_2d, ring_offsets = drop_closing_points(*shapely.get_coordinates(simplified, return_index=True),
+                                                      len(rings))
+        lengths = np.diff(ring_offsets)
+        ring_id = np.repeat(np.arange(len(rings)), lengths)
+        point_slices = ring_slices[rings][ring_id]
+
+    # each ring owns its points, so the point ids are just positions
+    offsets = np.r_[0, np.cumsum(lengths)]
+    following = np.arange(1, len(points_2d)+1)
+    closed = lengths > 0
+    following[offsets[1:][closed]-1] = offsets[:-1][closed]
+    lines = np.empty((len(points_2d), 3), dtype=np.int64)
+    lines[:, 0] = 2
+    lines[:, 1] = np.arange(len(points_2d))
+    lines[:, 2] = following
+
+    points = np.column_stack((points_2d, stack["z"][point_slices])).astype(np.float32)
+    polydata = pv.PolyData(points, lines=lines.ravel())
+    polydata.cell_data["polygon_id"] = rings[ring_id]
+    polydata.cell_data["layer_id"] = layers[point_slices]
+    return polydata
+
+def get_py3mf_from_arrays(meshes):
+    """
+    lib3mf model with one mesh object and build item per (points (N, 3),
+    triangles (M, 3)) pair. Degenerate triangles (repeated vertex indices)
+    are dropped and every mesh is set in a single SetGeometry call.
+    """
     wrapper = lib3mf.get_wrapper()
     model = wrapper.CreateModel()
+    for points, triangles in meshes:
+        triangles = np.asarray(triangles).reshape(-1, 3)
+        keep = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & \
+               (triangles[:, 0] != triangles[:, 2])
+        mesh_object = model.AddMeshObject()
+        set_mesh_buffers(mesh_object, points, triangles[keep])
+        model.AddBuildItem(mesh_object, wrapper.GetIdentityTransform())
+    return model
 
+def get_py3mf_from_pyvista(pyvista_meshes):
+    meshes = []
     for mesh in pyvista_meshes:
         mesh = mesh.triangulate()  # 🔹 Ensure all faces are triangles
-        mesh_object = model.AddMeshObject()
-        vertices = mesh.points
         faces = mesh.faces
-        
-        # Add vertices to the lib3mf mesh object
-        for vertex in vertices:
-            mesh_object.AddVertex(lib3mf.Position((c_float * 3)(vertex[0], vertex[1], vertex[2])))
-
-        # Add triangles to the lib3mf mesh object
-        i = 0
-        while i < len(faces):
-            n = faces[i]  # Number of vertices in the face
-            if n == 3:  # Triangle (expected now that we triangulated)
-                v1, v2, v3 = faces[i+1], faces[i+2], faces[i+3]
-                if v1 != v2 and v2 != v3 and v1 != v3:  # Avoid degenerate triangles
-                    mesh_object.AddTriangle(lib3mf.Triangle((c_uint32 * 3)(v1, v2, v3)))
-            else:
-                raise ValueError(f"Unexpected face with {n} vertices (should be 3 after triangulation)")
-            i += n + 1  # Move to the next face
-        
-        # Apply identity transformation
-        transform = lib3mf.Transform()
-        transform.m_Fields = [
-            [1.0, 0.0, 0.0],
-            [0.0, 1.0, 0.0],
-            [0.0, 0.0, 1.0],
-            [0.0, 0.0, 0.0]
-        ]
-        model.AddBuildItem(mesh_object, transform)
+        if len(faces) % 4 or np.any(faces[::4] != 3):
+            raise ValueError("Unexpected face with more than 3 vertices (should be 3 after triangulation)")
+        meshes.append((mesh.points, faces.reshape(-1, 4)[:, 1:]))
+    return get_py3mf_from_arrays(meshes)
 
-    return model
+def get_stack_z(model):
+    # z top of every slice, one array per slice stack
+    return get_layer_index(model).stack_z
+
+def get_z_table(model):
+    """
+    Global layer table of a sliced model. Returns (z_table, stack_layers):
+    z_table[i] is the z top of layer i and stack_layers[s][k] the layer of
+    slice k in slice stack s.
+
+    With uniform spacing layers follow the build grid (layer i at
+    (i+1)*layer_height, empty layers included) like the slicer writes them.
+    Otherwise the table is the sorted union of all slice heights.
+    """
+    index = get_layer_index(model)
+    return index.z_table, index.stack_layers
+
+def iter_layers(model):
+    """
+    Stream the sliced model one layer at a time. Yields (layer, z, slices)
+    where slices holds, per slice stack, the flat (vertices, indices,
+    offsets) buffers of that stack's slice on this layer or None. Only one
+    layer is held in memory at a time.
+    """
+    index = get_layer_index(model)
+    for layer, z in enumerate(index.z_table):
+        yield layer, float(z), index.get_layer(layer)
 
 def get_slices(model):
-    pv_model_slices = get_pyvista_slices(model)
-    levels = []
-    max_z = 0
-    for pv_model in pv_model_slices:
-        level =[]
-        for slice in pv_model:
-            level.append(slice.GetBounds()[4])
-        np_level = np.array(level)
-        levels.append(np_level)
-        max_z = max(max_z, np.max(np_level))
-
-    layer_height = get_layer_height(model)
-    z = layer_height
     slices = []
-
-    while z <= max_z:
+    for layer, z, layer_slices in iter_layers(model):
         slice = []
-        for i in range(len(pv_model_slices)):
-            positions = np.where(levels[i] == z)[0]
-            s = []
-            for pos in positions:
-                block = pv_model_slices[i][pos.item()] #[pos]
-                s.append(block)
-            slice.append(s)
+        for buffers in layer_slices:
+            slice.append([] if buffers is None else slice_buffers_to_pyvista(z, *buffers))
         slices.append(slice)
-        z += layer_height
     return slices
       
+def build_hierarchy(polygons, *, eps=1e-6):
+    """
+    Nest simple polygons (one ring each) into a Polygon/MultiPolygon.
+
+    Containment is found with one STRtree query: a ring's depth is the number
+    of rings covering it (within eps). Even depths are shells, odd depths are
+    holes of their directly enclosing shell, so islands inside holes inside
+    parts nest to any level. Returns None when nothing valid is left.
+    """
+    polygons = np.asarray(polygons, dtype=object)
+    areas = shapely.area(polygons) if len(polygons) else np.zeros(0)
+    keep = shapely.is_valid(polygons) & (areas > 0.0) if len(polygons) else np.zeros(0, dtype=bool)
+    polygons, areas = polygons[keep], areas[keep]
+    if len(polygons) == 0:
+        return None
+    # Sort big -> small so containers come before what they contain
+    order = np.argsort(-areas, kind="stable")
+    polygons, areas = polygons[order], areas[order]
+    if len(polygons) == 1:
+        return polygons[0]
+
+    # Use 'covers' on slightly grown rings to tolerate touching boundaries
+    tree = shapely.STRtree(shapely.buffer(polygons, eps))
+    inner, outer = tree.query(polygons, predicate="covered_by")
+    # Only larger rings (or an equal one listed earlier) can contain a ring
+    mask = outer < inner
+    inner, outer = inner[mask], outer[mask]
+    depth = np.bincount(inner, minlength=len(polygons))
+
+    # A hole belongs to the enclosing shell exactly one level up
+    direct = (depth[outer] == depth[inner]-1) & (depth[inner] % 2 == 1)
+    holes_of = {}
+    for hole, shell in zip(inner[direct], outer[direct]):
+        holes_of.setdefault(shell, []).append(polygons[hole].exterior)
+
+    out = []
+    for shell in np.flatnonzero(depth % 2 == 0):
+        if shell in holes_of:
+            out.append(Polygon(polygons[shell].exterior, holes_of[shell]))
+        else:
+            out.append(polygons[shell])
+    if len(out) == 1:
+        return out[0]
+    return MultiPolygon(out)
+
+def slice_buffers_to_polygons(vertices_2d, indices, offsets, *, eps=1e-6):
+    """
+    One shapely Polygon per ring of a slice (see buffers.get_slice_buffers),
+    built in bulk. Rings with less than 3 points, invalid rings and rings
+    with area <= eps are dropped.
+    """
+    lengths = np.diff(offsets)
+    rings = np.flatnonzero(lengths >= 3)
+    if len(rings) == 0:
+        return np.empty(0, dtype=object)
+    used = np.repeat(lengths >= 3, lengths)
+    ring_ids = np.repeat(np.arange(len(rings)), lengths[rings])
+    coords = vertices_2d.astype(float)[indices[used].astype(np.int64)]
+    polys = shapely.polygons(shapely.linearrings(coords, indices=ring_ids))
+    good = shapely.is_valid(polys) & (shapely.area(polys) > eps)
+    return polys[good]
+
 def get_shapely_slice(model, layer, *, eps=1e-6):
     """
     Build a per-slicestack shapely geometry (Polygon/MultiPolygon) at the given layer index.
     Returns a list aligned with slicestacks; entries are None when out of bounds.
     """
-
-    def create_hierarchy(polygons):
-        # Sort big -> small so outers come before inners
-        polygons = [p for p in polygons if p.is_valid and p.area > 0.0]
-        if not polygons:
-            return None
-        polygons.sort(key=lambda p: p.area, reverse=True)
-
-        top_level = [polygons[0]]
-        second_level = [[]]  # holes candidates per top poly
-
-        for i in range(1, len(polygons)):
-            p = polygons[i]
-            added = False
-            for ii, outer in enumerate(top_level):
-                # Use 'covers' instead of 'contains' to tolerate touching boundaries
-                if outer.buffer(eps).covers(p):
-                    # only add as a hole if it isn't inside an existing hole
-                    add_to_second_level = True
-                    for hole_poly in second_level[ii]:
-                        if hole_poly.buffer(eps).covers(p):
-                            add_to_second_level = False
-                            break
-                    if add_to_second_level:
-                        second_level[ii].append(p)
-                        added = True
-                        break
-            if not added:
-                top_level.append(p)
-                second_level.append([])
-
-        out = []
-        for outer, holes in zip(top_level, second_level):
-            if holes:
-                interiors = [h.exterior for h in holes]
-                out.append(Polygon(outer.exterior, interiors))
-            else:
-                out.append(outer)
-        if len(out) == 1:
-            return out[0]
-        return MultiPolygon(out)
-
-    # ---- geometry + layer bookkeeping ---------------------------------------
-    # Bounding boxes: assumed [(min_xyz, max_xyz), ...]
-    bounding_box = get_bounding_boxes(model)
-    # z_bound[i] = (zmin, zmax)
-    z_bound = np.array([(bb[0][2], bb[1][2]) for bb in bounding_box], dtype=float)
-
-    # layer height & target absolute height of this layer
-    layer_height = float(get_layer_height(model))
-    if layer_height <= 0:
-        raise ValueError("get_layer_height(model) must be > 0")
-    height = layer * layer_height
-
-    # Collect slicestacks safely
-    slice_stack_iterator = model.GetSliceStacks()
-    slicestacks = []
-    while slice_stack_iterator.MoveNext():
-        try:
-            slicestacks.append(slice_stack_iterator.GetCurrentSliceStack())
-        except Exception as e:
-            print(f"Error accessing slice stack: {e}")
+    # ---- layer bookkeeping (cached per model) -------------------------------
+    index = get_layer_index(model)
+    if index.layer_count == 0:
+        raise ValueError("model has no slices")
 
     shapely_slice = []
 
-    for index, slicestack in enumerate(slicestacks):
-        zmin, zmax = z_bound[index]
-        # Normalize ordering (just in case)
-        if zmin > zmax:
-            zmin, zmax = zmax, zmin
-
-        # Is this height within this stack's vertical extent?
-        if (zmin - eps) <= height <= (zmax + eps):
-            # Compute the integer layer index inside this stack
-            raw = (height - zmin) / layer_height
-            stack_layer = int(round(raw))
-
-            # Clamp to valid slice index range
-            try:
-                slice_count = int(slicestack.GetSliceCount())
-            except Exception:
-                # If API doesn't provide it, we’ll try/except per access below
-                slice_count = None
-
-            if slice_count is not None:
-                if stack_layer < 0 or stack_layer >= slice_count:
-                    shapely_slice.append(None)
-                    continue
-
-            try:
-                slc = slicestack.GetSlice(stack_layer)
-            except Exception:
-                shapely_slice.append(None)
-                continue
-
-            vertices_list = slc.GetVertices()
-            if not vertices_list:
-                shapely_slice.append(None)
-                continue
-
-            # Build numpy of (x, y); we’re slicing a horizontal plane
-            np_vertices = np.array(
-                [[v.Coordinates[0], v.Coordinates[1]] for v in vertices_list],
-                dtype=float
-            )
-
-            # Construct polygons; filter degenerate rings
-            polys = []
-            poly_count = slc.GetPolygonCount()
-            for k in range(poly_count):
-                idx = slc.GetPolygonIndices(k)
-                if idx is None or len(idx) < 3:
-                    continue
-                ring = np_vertices[np.asarray(idx, dtype=int)]
-                # Remove consecutive duplicates
-                if len(ring) >= 2 and np.allclose(ring[0], ring[-1]):
-                    # Shapely doesn't require explicit closure; ok either way
-                    pass
-                # Skip degenerate polygons (zero area / tiny)
-                poly = Polygon(ring)
-                if not poly.is_valid or poly.area <= eps:
-                    continue
-                polys.append(poly)
-
-            if not polys:
-                shapely_slice.append(None)
-                continue
-
-            # If multiple polygons, build hierarchy (holes) if needed
-            geom = polys[0] if len(polys) == 1 else create_hierarchy(polys)
-            shapely_slice.append(geom)
-        else:
+    for stack in range(len(index.slicestacks)):
+        buffers = index.get_slice_buffers(stack, layer)
+        if buffers is None or len(buffers[0]) == 0:
             shapely_slice.append(None)
+            continue
+
+        # Construct polygons; filter degenerate rings
+        polys = slice_buffers_to_polygons(*buffers, eps=eps)
+        if len(polys) == 0:
+            shapely_slice.append(None)
+            continue
+
+        # If multiple polygons, build hierarchy (holes) if needed
+        geom = polys[0] if len(polys) == 1 else build_hierarchy(polys, eps=eps)
+        shapely_slice.append(geom)
 
     return shapely_slice
 
@@ -0,0 +1,183 @@
+import os
+import numpy as np
+import shapely
+from concurrent.futures import ProcessPoolExecutor
+
+from py3mf_slicer.index import get_layer_index
+from py3mf_slicer.get_items import slice_buffers_to_polygons, build_hierarchy
+from py3mf_slicer.contours import expand_ranges, drop_closing_points
+
+# Hatching works on the flat slice buffers (vertices, indices, offsets) of
+# buffers.get_slice_buffers. All ring edges of a slice are rotated into a
+# frame where the hatch lines are horizontal, every edge is cut with the
+# scanlines it spans in one vectorised pass and the crossings are paired
+# per scanline (even-odd rule, so holes need no special handling).
+# Scanlines sit on a global grid (y = k*spacing in the hatch frame), so
+# the vectors of neighbouring parts and layers line up.
+
+PATTERNS = ("lines", "stripes", "chessboard")
+
+def _rotation(angle):
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    return np.array([[c, -s], [s, c]])
+
+def ring_edges(vertices, indices, offsets):
+    """ (starts, ends) of every edge of every closed ring """
+    indices = np.asarray(indices, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    following = np.arange(1, len(indices)+1)
+    following[offsets[1:]-1] = offsets[:-1]
+    vertices = np.asarray(vertices, dtype=np.float64)
+    return vertices[indices], vertices[indices[following]]
+
+def scanline_segments(starts, ends, spacing):
+    """
+    Hatch segments inside closed rings given by their edges, for the
+    horizontal scanlines y = k*spacing. Returns (x0, x1, k) with x0 < x1.
+    """
+    y0, y1 = starts[:, 1], ends[:, 1]
+    lo, hi = np.minimum(y0, y1), np.maximum(y0, y1)
+    # half open [lo, hi): every scanline crosses a closed ring an even number of times
+    first = np.ceil(lo/spacing).astype(np.int64)
+    counts = np.maximum(np.ceil(hi/spacing).astype(np.int64)-first, 0)
+    edge = np.repeat(np.arange(len(starts)), counts)
+    k = expand_ranges(first, counts)
+    y = k*spacing
+    t = (y-y0[edge])/(y1[edge]-y0[edge])
+    x = starts[edge, 0]+t*(ends[edge, 0]-starts[edge, 0])
+    order = np.lexsort((x, k))
+    x = x[order].reshape(-1, 2)
+    k = k[order][::2]
+    keep = x[:, 1] > x[:, 0]
+    return x[keep, 0], x[keep, 1], k[keep]
+
+def split_cells(x0, x1, k, spacing, cell_size):
+    """ Cut segments at x = m*cell_size; returns (x0, x1, k, column, row) """
+    first = np.floor(x0/cell_size).astype(np.int64)
+    counts = np.maximum(np.ceil(x1/cell_size).astype(np.int64)-first, 1)
+    segment = np.repeat(np.arange(len(x0)), counts)
+    column = expand_ranges(first, counts)
+    start = np.maximum(x0[segment], column*cell_size)
+    end = np.minimum(x1[segment], (column+1)*cell_size)
+    keep = end > start
+    k = k[segment][keep]
+    row = np.floor(k*spacing/cell_size).astype(np.int64)
+    return start[keep], end[keep], k, column[keep], row
+
+def _hatch_frame(vertices, indices, offsets, spacing, angle):
+    starts, ends = ring_edges(vertices, indices, offsets)
+    rotation = _rotation(-angle)
+    return scanline_segments(starts @ rotation.T, ends @ rotation.T, spacing)
+
+def _to_world(x0, x1, k, spacing, angle):
+    y = k*spacing
+    segments = np.stack([np.stack([x0, y], axis=1), np.stack([x1, y], axis=1)], axis=1)
+    return segments @ _rotation(angle).T
+
+def inset_rings(vertices, indices, offsets, distance):
+    """
+    Rings of a slice moved inwards by distance (outwards when negative),
+    as (vertices, indices, offsets) again.
+    """
+    polygons = slice_buffers_to_polygons(vertices, indices, offsets, eps=1e-6)
+    if len(polygons) == 0:
+        return np.zeros((0, 2)), np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    geometry = polygons[0] if len(polygons) == 1 else build_hierarchy(polygons)
+    parts = shapely.get_parts(shapely.buffer(geometry, -distance))
+    rings = shapely.get_rings(parts[~shapely.is_empty(parts)])
+    vertices, new_offsets = drop_closing_points(*shapely.get_coordinates(rings, return_index=True), len(rings))
+    return vertices, np.arange(len(vertices)), new_offsets
+
+def hatch_slice(vertices, indices, offsets, spacing, angle=0.0, pattern="lines", cell_size=5.0, contour_offset=0.0):
+    """
+    Hatch vectors of one slice as (K, 2, 2) float64 start/end points.
+
+    pattern "lines" fills the slice with parallel lines at angle (degrees),
+    "stripes" cuts them into stripes cell_size wide and "chessboard" into
+    cell_size squares, hatched alternately at angle and angle+90. Vectors
+    are ordered cell by cell and meander within a cell. contour_offset
+    shrinks the hatched area away from the contour first.
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown hatch pattern '{pattern}', expected one of {', '.join(PATTERNS)}")
+    if contour_offset:
+        vertices, indices, offsets = inset_rings(vertices, indices, offsets, contour_offset)
+    if len(offsets) < 2:
+        return np.zeros((0, 2, 2))
+
+    x0, x1, k = _hatch_frame(vertices, indices, offsets, spacing, angle)
+    if pattern == "lines":
+        order = np.lexsort((x0, k))
+        x0, x1, k = x0[order], x1[order], k[order]
+        flip = k % 2 == 1
+        x0, x1 = np.where(flip, x1, x0), np.where(flip, x0, x1)
+        return _to_world(x0, x1, k, spacing, angle)
+
+    x0, x1, k, column, row = split_cells(x0, x1, k, spacing, cell_size)
+    if pattern == "stripes":
+        row = np.zeros_like(row)
+    passes = [(angle, x0, x1, k, column, row)]
+    if pattern == "chessboard":
+        even = (column+row) % 2 == 0
+        passes = [(angle, x0[even], x1[even], k[even], column[even], row[even])]
+        # second pass turned by 90 degrees: its frame x is the first frame y
+        # and its frame y the negated first frame x
+        x0, x1, k = _hatch_frame(vertices, indices, offsets, spacing, angle+90)
+        x0, x1, k, column, row = split_cells(x0, x1, k, spacing, cell_size)
+        first_column = np.floor(-k*spacing/cell_size).astype(np.int64)
+        odd = (first_column+column) % 2 == 1
+        passes.append((angle+90, x0[odd], x1[odd], k[odd], first_column[odd], column[odd]))
+
+    segments, cells = [], []
+    for pass_angle, x0, x1, k, column, row in passes:
+        flip = k % 2 == 1
+        segments.append(_to_world(np.where(flip, x1, x0), np.where(flip, x0, x1), k, spacing, pass_angle))
+        cells.append(np.stack([row, column, k, np.minimum(x0, x1)], axis=1))
+    cells = np.concatenate(cells)
+    order = np.lexsort((cells[:, 3], cells[:, 2], cells[:, 1], cells[:, 0]))
+    return np.concatenate(segments)[order]
+
+def _hatch_layers(jobs, options):
+    results = []
+    for angle, slices in jobs:
+        results.append([hatch_slice(*buffers, angle=angle, **options) for buffers in slices])
+    return results
+
+def hatch_model(model, spacing, angle=0.0, angle_increment=67.0, pattern="lines", cell_size=5.0,
+                contour_offset=0.0, workers=None, chunk_size=16):
+    """
+    Hatch every layer of a sliced model. Layer i is hatched at
+    angle+i*angle_increment degrees; the remaining options are those of
+    hatch_slice. Layers are spread over a process pool when workers > 1.
+
+    Returns (segments, layer_offsets, stack_ids): all vectors as (K, 2, 2)
+    float32 start/end points, layer i owning segments[layer_offsets[i]:
+    layer_offsets[i+1]], and the slice stack every vector belongs to.
+    """
+    index = get_layer_index(model)
+    options = dict(spacing=spacing, pattern=pattern, cell_size=cell_size, contour_offset=contour_offset)
+    jobs = []
+    for layer in range(index.layer_count):
+        slices = [(s, buffers) for s, buffers in enumerate(index.get_layer(layer)) if buffers is not None]
+        jobs.append(((angle+layer*angle_increment) % 180, slices))
+    chunks = [jobs[i:i+chunk_size] for i in range(0, len(jobs), chunk_size)]
+    stripped = [[(job_angle, [buffers for _, buffers in slices]) for job_angle, slices in chunk] for chunk in chunks]
+
+    workers = workers or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as pool:
+            results = list(pool.map(_hatch_layers, stripped, [options]*len(chunks)))
+    else:
+        results = [_hatch_layers(chunk, options) for chunk in stripped]
+
+    segments, stack_ids, counts = [], [], []
+    for chunk, chunk_results in zip(chunks, results):
+        for (_, slices), layer_results in zip(chunk, chunk_results):
+            counts.append(sum(len(r) for r in layer_results))
+            for (stack, _), result in zip(slices, layer_results):
+                segments.append(result)
+                stack_ids.append(np.full(len(result), stack, dtype=np.int32))
+    layer_offsets = np.zeros(len(counts)+1, dtype=np.int64)
+    np.cumsum(counts, out=layer_offsets[1:])
+    segments = np.concatenate(segments+[np.zeros((0, 2, 2))]).astype(np.float32)
+    return segments, layer_offsets, np.concatenate(stack_ids+[np.zeros(0, dtype=np.int32)])
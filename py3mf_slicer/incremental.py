@@ -0,0 +1,69 @@
+from collections import defaultdict
+import lib3mf
+
+from py3mf_slicer import slice as slicer
+from py3mf_slicer.buffers import (get_mesh_objects, get_mesh_buffers, set_mesh_buffers, get_build_items,
+                                  transform_to_array, add_slice_stack_buffers, object_key)
+
+class IncrementalSlicer:
+    """
+    Re-slices only the mesh objects that changed since the previous call.
+
+    Stacks are sliced in mesh coordinates, so they are keyed by the
+    object_key of the geometry alone: stacks of known keys are reused,
+    the rest are sliced with slice.slice_model(**options). dirty lists the
+    mesh objects whose geometry or build transforms changed, resliced
+    those that actually had to be sliced again.
+    lib3mf can not remove slice stacks, so reslice returns a new model
+    holding copies of the meshes and build items plus one stack per mesh
+    object, in mesh object order, like slice_model. Stacks of keys that
+    are no longer in the model are dropped.
+    """
+
+    def __init__(self, layer_height, **options):
+        self.layer_height = layer_height
+        self.options = options
+        self.dirty = []
+        self.resliced = []
+        self._stacks = {}
+        self._placements = set()
+
+    def reslice(self, model):
+        wrapper = lib3mf.get_wrapper()
+        sliced_model = wrapper.CreateModel()
+        build_items = get_build_items(model)
+        transforms = defaultdict(list)
+        for build_item in build_items:
+            transforms[build_item.GetObjectResource().GetUniqueResourceID()].append(
+                transform_to_array(build_item.GetObjectTransform()))
+
+        copies = {}
+        keys = []
+        placements = set()
+        self.dirty = []
+        self.resliced = []
+        for i, mesh_object in enumerate(get_mesh_objects(model)):
+            resource_id = mesh_object.GetUniqueResourceID()
+            vertices, triangles = get_mesh_buffers(mesh_object)
+            key = object_key(vertices, triangles)
+            placement = (key, tuple(transform.tobytes() for transform in transforms[resource_id]))
+            if placement not in self._placements:
+                self.dirty.append(i)
+            if key not in self._stacks:
+                self._stacks[key] = slicer.slice_mesh_buffers(vertices, triangles, self.layer_height, **self.options)
+                self.resliced.append(i)
+            keys.append(key)
+            placements.add(placement)
+            copies[resource_id] = sliced_model.AddMeshObject()
+            set_mesh_buffers(copies[resource_id], vertices, triangles)
+
+        for build_item in build_items:
+            resource_id = build_item.GetObjectResource().GetUniqueResourceID()
+            if resource_id in copies:
+                sliced_model.AddBuildItem(copies[resource_id], build_item.GetObjectTransform())
+        for key in keys:
+            if self._stacks[key] is not None:
+                add_slice_stack_buffers(sliced_model, *self._stacks[key])
+        self._stacks = {key: self._stacks[key] for key in keys}
+        self._placements = placements
+        return sliced_model
@@ -0,0 +1,114 @@
+import numpy as np
+
+# The per model cache lives in buffers, next to the slice stack writers that
+# invalidate it
+from py3mf_slicer.buffers import get_slice_stacks, get_slice_buffers, _layer_indices, invalidate_layer_index
+
+def stack_layer_height(stack_z):
+    # Spacing of the first slice stack, as get_items.get_layer_height always did
+    for z in stack_z:
+        if len(z) > 1:
+            return (z[-1]-z[0])/(len(z)-1)
+        if len(z) == 1:
+            return z[0]
+    return 0
+
+def layer_table(stack_z, layer_height, tol=1e-6):
+    """
+    Global layer table of slice stacks with the given z tops: returns
+    (z_table, stack_layers) with the layer number of every slice. Stacks
+    on a common layer_height grid keep layer i at (i+1)*layer_height,
+    otherwise the table is the sorted union of all z tops.
+    """
+    all_z = np.concatenate(stack_z) if len(stack_z) else np.zeros(0)
+    if len(all_z) == 0:
+        return all_z, list(stack_z)
+
+    layer_height = float(layer_height)
+    if layer_height > 0:
+        grid = all_z/layer_height
+        # z tops may carry float32 rounding (3MF files, float32 meshes), so the
+        # tolerance grows with z instead of dropping tall builds off the grid
+        slack = tol/layer_height+8*np.finfo(np.float32).eps*np.abs(grid)
+        if np.all(np.abs(grid-np.round(grid)) < slack):
+            grid_layers = np.round(grid).astype(np.int64)-1
+            grid_layers -= min(0, grid_layers.min())
+            z_table = layer_height*(np.arange(grid_layers.max()+1)+1)
+            z_table[grid_layers] = all_z
+            bounds = np.cumsum([0]+[len(z) for z in stack_z])
+            return z_table, [grid_layers[bounds[i]:bounds[i+1]] for i in range(len(stack_z))]
+
+    unique_z = np.sort(all_z)
+    z_table = unique_z[np.r_[True, np.diff(unique_z) > tol]]
+    return z_table, [np.searchsorted(z_table, z+tol, side="right")-1 for z in stack_z]
+
+class LayerIndex:
+    """
+    Layer bookkeeping of a sliced model, read from lib3mf once.
+
+    Holds per slice stack the slice z tops, z range, slice count and the
+    cumulative vertex/polygon counts of its slices, plus the global layer
+    table (see get_z_table). The table is explicit, so stacks sliced with
+    non-uniform (adaptive) layer heights are handled like uniform ones. Looking up a layer is then O(1) and fetching
+    it only touches that layer's slices.
+    """
+
+    def __init__(self, model, tol=1e-6):
+        self.tol = tol
+        self.slicestacks = get_slice_stacks(model)
+        self.stack_z = []
+        self.vertex_offsets = []
+        self.polygon_offsets = []
+        for slicestack in self.slicestacks:
+            slices = [slicestack.GetSlice(i) for i in range(slicestack.GetSliceCount())]
+            self.stack_z.append(np.array([s.GetZTop() for s in slices], dtype=np.float64))
+            self.vertex_offsets.append(np.cumsum([0]+[s.GetVertexCount() for s in slices]))
+            self.polygon_offsets.append(np.cumsum([0]+[s.GetPolygonCount() for s in slices]))
+        self.slice_counts = [len(z) for z in self.stack_z]
+        self.z_ranges = [(z[0], z[-1]) if len(z) else (None, None) for z in self.stack_z]
+        self.stack_bottoms = [slicestack.GetBottomZ() for slicestack in self.slicestacks]
+        self.layer_height = stack_layer_height(self.stack_z)
+        self.z_table, self.stack_layers = layer_table(self.stack_z, self.layer_height, tol)
+
+        # stack_slices[s][layer] is the slice index of that layer or -1
+        self.stack_slices = np.full((len(self.slicestacks), len(self.z_table)), -1, dtype=np.int64)
+        for s, layers in enumerate(self.stack_layers):
+            self.stack_slices[s, layers] = np.arange(len(layers))
+
+    @property
+    def layer_count(self):
+        return len(self.z_table)
+
+    @property
+    def layer_heights(self):
+        """ Thickness of every layer: distance to the previous z top (or lowest stack bottom) """
+        if len(self.z_table) == 0:
+            return np.zeros(0)
+        bottom = min(self.stack_bottoms)
+        return np.diff(self.z_table, prepend=min(bottom, self.z_table[0]))
+
+    def slice_index(self, stack, layer):
+        """ Slice index of the layer inside the stack, or -1 when absent """
+        if layer < 0 or layer >= self.layer_count:
+            return -1
+        return int(self.stack_slices[stack, layer])
+
+    def get_slice(self, stack, layer):
+        k = self.slice_index(stack, layer)
+        return None if k < 0 else self.slicestacks[stack].GetSlice(k)
+
+    def get_slice_buffers(self, stack, layer):
+        slice = self.get_slice(stack, layer)
+        return None if slice is None else get_slice_buffers(slice)
+
+    def get_layer(self, layer):
+        """ Flat slice buffers (or None) of every stack on this layer """
+        return [self.get_slice_buffers(s, layer) for s in range(len(self.slicestacks))]
+
+def get_layer_index(model):
+    """ Cached LayerIndex of the model, built on first use """
+    index = _layer_indices.get(model)
+    if index is None:
+        index = LayerIndex(model)
+        _layer_indices[model] = index
+    return index
@@ -0,0 +1,48 @@
+import numpy as np
+
+from py3mf_slicer.buffers import object_key
+
+# Copies of a part placed next to each other on a plate only differ by an
+# xy translation of their vertices. Their slices then only differ by the
+# same translation (z is untouched, so the layer grid is identical), which
+# lets one slice stack serve every copy.
+
+def instance_key(vertices, triangles):
+    """
+    (key, origin) of a mesh: key hashes the triangle buffer and the vertex
+    count, origin is the xy minimum of the vertices. Meshes can only be
+    copies of each other when their keys match.
+    """
+    origin = np.asarray(vertices, dtype=np.float64)[:, :2].min(axis=0)
+    return object_key(np.array([len(vertices)]), np.asarray(triangles)), origin
+
+def find_instances(meshes, tol=1e-4):
+    """
+    For (vertices, triangles) pairs return (representatives, origins):
+    the index of the first mesh with the same geometry up to an xy
+    translation (itself for unique meshes, -1 for empty ones) and the xy
+    origin of every mesh. Vertices of copies must agree within tol after
+    moving them onto the representative.
+    """
+    representatives = np.full(len(meshes), -1, dtype=np.int64)
+    origins = np.zeros((len(meshes), 2))
+    candidates = {}
+    for i, (vertices, triangles) in enumerate(meshes):
+        if len(vertices) == 0:
+            continue
+        key, origins[i] = instance_key(vertices, triangles)
+        representatives[i] = i
+        for candidate in candidates.setdefault(key, []):
+            offset = np.r_[origins[i]-origins[candidate], 0]
+            if np.allclose(np.asarray(vertices, dtype=np.float64)-offset, meshes[candidate][0], rtol=0, atol=tol):
+                representatives[i] = candidate
+                break
+        else:
+            candidates[key].append(i)
+    return representatives, origins
+
+def translate_stack(stack, offset):
+    """ Copy of a slice stack dict moved by an xy offset, sharing the index arrays """
+    moved = dict(stack)
+    moved["vertices"] = (stack["vertices"]+np.asarray(offset, dtype=np.float64)).astype(np.float32)
+    return moved
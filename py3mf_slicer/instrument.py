@@ -0,0 +1,97 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+# Opt-in metrics for slice.slice_model. The slicing code talks to an
+# Instrumentation object; without one it gets DISABLED, whose methods do
+# nothing, so an uninstrumented run only pays for a few no-op calls per
+# mesh object and never computes per-layer statistics.
+
+class Instrumentation:
+    """
+    Collects per-stage timings, counters and per-layer statistics of a
+    slicing run.
+
+    observer, when given, is called as observer(event, data) with:
+      "stage"  {"stage", "seconds"} after every timed stage
+      "stack"  {"stack", "stacks", "layers", "segments", "rings", "vertices"}
+               after every slice stack written, for progress reporting
+    """
+    enabled = True
+
+    def __init__(self, observer=None):
+        self.observer = observer
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.layers = []
+        self.stack_count = 0
+
+    def notify(self, event, **data):
+        if self.observer is not None:
+            self.observer(event, data)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter()-start
+            self.stages[name] += seconds
+            self.notify("stage", stage=name, seconds=seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] += int(value)
+
+    def add_stack(self, stack, segments, stacks=None):
+        """
+        Record one written slice stack (buffers.get_slice_stack_buffers
+        layout) with the number of cut segments of every layer.
+        """
+        rings = np.diff(stack["slice_polygon_offsets"])
+        vertices = np.diff(stack["vertex_offsets"])
+        segments = np.asarray(segments, dtype=np.int64)
+        index = self.stack_count
+        for layer, z in enumerate(stack["z"]):
+            self.layers.append({"stack": index, "layer": layer, "z": float(z), "segments": int(segments[layer]),
+                                "rings": int(rings[layer]), "vertices": int(vertices[layer])})
+        self.stack_count += 1
+        self.count("stacks")
+        self.count("layers", len(stack["z"]))
+        self.count("segments", segments.sum())
+        self.count("rings", rings.sum())
+        self.count("vertices", vertices.sum())
+        self.notify("stack", stack=index, stacks=stacks, layers=len(stack["z"]), segments=int(segments.sum()),
+                    rings=int(rings.sum()), vertices=int(vertices.sum()))
+
+    def report(self):
+        return {
+            "stages": dict(self.stages),
+            "total_seconds": sum(self.stages.values()),
+            "counters": dict(self.counters),
+            "layers": list(self.layers),
+        }
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+class _Disabled:
+    enabled = False
+
+    def notify(self, event, **data):
+        pass
+
+    def stage(self, name):
+        return _NO_STAGE
+
+    def count(self, name, value=1):
+        pass
+
+    def add_stack(self, stack, segments, stacks=None):
+        pass
+
+_NO_STAGE = nullcontext()
+DISABLED = _Disabled()
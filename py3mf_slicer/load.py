@@ -1,7 +1,11 @@
 from lib3mf import get_wrapper
+from concurrent.futures import ThreadPoolExecutor
 import lib3mf
 import os
 
+from py3mf_slicer.buffers import (get_mesh_objects, get_mesh_buffers, set_mesh_buffers, get_build_items,
+                                  transform_to_array, array_to_transform)
+
 def load_file(path):
     file_extension = os.path.splitext(path)[1].lower()
     if file_extension[1:] == 'stl' or file_extension[1:] == 'obj'or file_extension[1:] == '3mf':
@@ -14,31 +18,41 @@ def load_file(path):
         print("Import file format not supported")
     return None
 
-def load_files(paths):
-    def add_mesh_objects(source_model, target_model):
-        mesh_iterator = source_model.GetMeshObjects()
-        while mesh_iterator.MoveNext():
-            mesh_object = mesh_iterator.GetCurrentMeshObject()
-            new_mesh_object = target_model.AddMeshObject()
-            
-            # Copy vertices and triangles
-            vertices = mesh_object.GetVertices()
-            triangles = mesh_object.GetTriangleIndices()
-            new_mesh_object.SetGeometry(vertices, triangles)
-            
-            # Add the new mesh object to the build
-            transform = lib3mf.Transform()
-            transform.m_Fields = [
-                [1.0, 0.0, 0.0],
-                [0.0, 1.0, 0.0],
-                [0.0, 0.0, 1.0],
-                [0.0, 0.0, 0.0]
-            ]
-            target_model.AddBuildItem(new_mesh_object, transform)
-            
+def _read_meshes(path):
+    # Parse one file and keep only its mesh buffers and build transforms, so
+    # the source model is released inside the worker
+    model = load_file(path)
+    if model is None:
+        return []
+    meshes = []
+    mesh_ids = {}
+    for mesh_object in get_mesh_objects(model):
+        mesh_ids[mesh_object.GetUniqueResourceID()] = len(meshes)
+        meshes.append((*get_mesh_buffers(mesh_object), []))
+    for build_item in get_build_items(model):
+        resource_id = build_item.GetObjectResource().GetUniqueResourceID()
+        if resource_id in mesh_ids:
+            meshes[mesh_ids[resource_id]][2].append(transform_to_array(build_item.GetObjectTransform()))
+    return meshes
+
+def load_files(paths, workers=None):
+    """
+    Merge the mesh objects of several files into one model. Files are
+    parsed concurrently on a thread pool (lib3mf parses in native code
+    without holding the GIL) and merged in path order as bulk buffers.
+    Every source build item is carried over with its transform; meshes
+    that are not built on their own get an identity build item.
+    """
     wrapper = lib3mf.get_wrapper()
     merged_model = wrapper.CreateModel()
-    for path in paths:
-        add_mesh_objects(load_file(path), merged_model)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for meshes in pool.map(_read_meshes, paths):
+            for vertices, triangles, transforms in meshes:
+                new_mesh_object = merged_model.AddMeshObject()
+                set_mesh_buffers(new_mesh_object, vertices, triangles)
+                for transform in transforms or [None]:
+                    if transform is None:
+                        merged_model.AddBuildItem(new_mesh_object, wrapper.GetIdentityTransform())
+                    else:
+                        merged_model.AddBuildItem(new_mesh_object, array_to_transform(transform))
     return merged_model
-    
@@ -0,0 +1,84 @@
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+from py3mf_slicer.get_items import slice_buffers_to_polygons, build_hierarchy
+from py3mf_slicer.contours import ring_areas, reverse_rings, drop_closing_points
+from py3mf_slicer.buffers import get_slice_stacks, get_slice_stack_buffers, add_slice_stack_buffers, stack_from_rings
+from py3mf_slicer.index import invalidate_layer_index
+
+# Contour offsetting (beam/kerf compensation) for whole slice stacks: the
+# slices become one array of shapely geometries, shapely.buffer runs once
+# for all layers and all distances, and the results are turned back into
+# stack dicts (buffers.get_slice_stack_buffers layout) in bulk.
+
+def stack_geometries(stack, eps=1e-6):
+    """ One Polygon/MultiPolygon per slice of a stack dict, empty slices give an empty Polygon """
+    geometries = np.empty(len(stack["z"]), dtype=object)
+    vertex_offsets = stack["vertex_offsets"]
+    polygon_offsets = stack["polygon_offsets"]
+    slice_polygon_offsets = stack["slice_polygon_offsets"]
+    for i in range(len(stack["z"])):
+        first, last = slice_polygon_offsets[i], slice_polygon_offsets[i+1]
+        offsets = polygon_offsets[first:last+1]
+        polygons = slice_buffers_to_polygons(stack["vertices"][vertex_offsets[i]:vertex_offsets[i+1]],
+                                             stack["indices"][offsets[0]:offsets[-1]], offsets-offsets[0], eps=eps)
+        geometry = None
+        if len(polygons) == 1:
+            geometry = polygons[0]
+        elif len(polygons) > 1:
+            geometry = build_hierarchy(polygons, eps=eps)
+        geometries[i] = Polygon() if geometry is None else geometry
+    return geometries
+
+def offset_geometries(geometries, distances, **buffer_options):
+    """ (len(geometries), len(distances)) array of offset geometries, in one shapely.buffer call """
+    geometries = np.asarray(geometries, dtype=object)
+    distances = np.asarray(distances, dtype=np.float64).ravel()
+    # shapely 2.0 buffer only broadcasts over 1-D arrays
+    offset = shapely.buffer(np.repeat(geometries, len(distances)), np.tile(distances, len(geometries)),
+                            **buffer_options)
+    return offset.reshape(len(geometries), len(distances))
+
+def geometries_to_stack(z, geometries):
+    """
+    Stack dict with one slice per geometry. Exteriors are written counter
+    clockwise and holes clockwise, like the slicer output.
+    """
+    parts, part_layers = shapely.get_parts(np.asarray(geometries, dtype=object), return_index=True)
+    keep = ~shapely.is_empty(parts)
+    parts, part_layers = parts[keep], part_layers[keep]
+    rings, ring_parts = shapely.get_rings(parts, return_index=True)
+    exterior = np.r_[True, ring_parts[1:] != ring_parts[:-1]]
+    vertices, ring_offsets = drop_closing_points(*shapely.get_coordinates(rings, return_index=True), len(rings))
+    areas = ring_areas(vertices, ring_offsets)
+    source = reverse_rings(ring_offsets, np.where(exterior, areas < 0, areas > 0))
+    return stack_from_rings(z, vertices[source], ring_offsets, part_layers[ring_parts])
+
+def offset_stack(stack, distances, eps=1e-6, **buffer_options):
+    """ One offset stack dict per distance (positive grows, negative shrinks) """
+    offset = offset_geometries(stack_geometries(stack, eps=eps), distances, **buffer_options)
+    return [geometries_to_stack(stack["z"], offset[:, d]) for d in range(offset.shape[1])]
+
+def offset_model(model, distances, write=False, eps=1e-6, **buffer_options):
+    """
+    Offset every slice stack of a sliced model by every distance, with a
+    single shapely.buffer call over all stacks, layers and distances.
+    Returns result[d][s], the stack dict of stack s offset by distances[d].
+    With write=True the offset stacks are also added to the model, per
+    distance in stack order.
+    """
+    slicestacks = get_slice_stacks(model)
+    stacks = [get_slice_stack_buffers(slicestack) for slicestack in slicestacks]
+    geometries = [stack_geometries(stack, eps=eps) for stack in stacks]
+    bounds = np.cumsum([0]+[len(g) for g in geometries])
+    offset = offset_geometries(np.concatenate(geometries+[np.empty(0, dtype=object)]), distances, **buffer_options)
+
+    result = [[geometries_to_stack(stack["z"], offset[bounds[s]:bounds[s+1], d]) for s, stack in enumerate(stacks)]
+              for d in range(offset.shape[1])]
+    if write:
+        for offset_stacks in result:
+            for slicestack, stack in zip(slicestacks, offset_stacks):
+                add_slice_stack_buffers(model, stack, slicestack.GetBottomZ())
+        invalidate_layer_index(model)
+    return result
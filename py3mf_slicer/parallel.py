@@ -0,0 +1,105 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from py3mf_slicer.sweep import mesh_z_levels, sweep_slice
+from py3mf_slicer.contours import assemble_contours
+from py3mf_slicer.buffers import get_mesh_objects, get_mesh_buffers, add_slice_stack_buffers, stack_from_rings
+from py3mf_slicer.instrument import DISABLED
+
+# Geometry lives in one shared memory block per dtype: float32 vertices and
+# uint32 triangles of all mesh objects back to back. Workers attach once and
+# slice z-bands of it, only the (small) contour arrays travel back pickled.
+
+_shared = {}
+
+def _attach(vertex_name, vertex_count, triangle_name, triangle_count):
+    vertex_block = shared_memory.SharedMemory(name=vertex_name)
+    triangle_block = shared_memory.SharedMemory(name=triangle_name)
+    _shared["blocks"] = (vertex_block, triangle_block)
+    _shared["vertices"] = np.ndarray((vertex_count, 3), dtype=np.float32, buffer=vertex_block.buf)
+    _shared["triangles"] = np.ndarray((triangle_count, 3), dtype=np.uint32, buffer=triangle_block.buf)
+
+def _slice_band(vertex_range, triangle_range, z_levels):
+    vertices = _shared["vertices"][vertex_range[0]:vertex_range[1]]
+    triangles = _shared["triangles"][triangle_range[0]:triangle_range[1]]
+    tri_z = vertices[triangles, 2]
+    spanning = (tri_z.min(axis=1) < z_levels[-1]) & (tri_z.max(axis=1) >= z_levels[0])
+    layer_ids, starts, ends = sweep_slice(vertices, triangles[spanning], z_levels)
+    return assemble_contours(layer_ids, starts, ends)+(np.bincount(layer_ids, minlength=len(z_levels)),)
+
+def _shared_copy(array):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block
+
+def _merge_bands(results, band_starts):
+    # Stitch band results back together in z order
+    vertices = [r[0] for r in results]
+    ring_layers = [r[2]+start for r, start in zip(results, band_starts)]
+    lengths = [np.diff(r[1]) for r in results]
+    ring_offsets = np.zeros(sum(len(l) for l in lengths)+1, dtype=np.int64)
+    np.cumsum(np.concatenate(lengths), out=ring_offsets[1:])
+    segments = np.concatenate([r[3] for r in results])
+    return np.concatenate(vertices), ring_offsets, np.concatenate(ring_layers), segments
+
+def slice_model_parallel(model, layer_height, workers=None, bands_per_worker=4, adaptive=None,
+                         instrumentation=DISABLED):
+    """
+    Slice all mesh objects of the model with the sweep engine on a pool of
+    worker processes. Work is split by mesh object and, for large objects,
+    into z-bands so roughly bands_per_worker tasks land on every worker.
+    Slice stacks are added in mesh object order, exactly as the serial
+    sweep backend does. adaptive is passed on to sweep.mesh_z_levels.
+    """
+    workers = workers or os.cpu_count() or 1
+    with instrumentation.stage("meshes"):
+        meshes = [get_mesh_buffers(mesh_object) for mesh_object in get_mesh_objects(model)]
+    meshes = [(vertices, triangles) for vertices, triangles in meshes if len(vertices)]
+    if not meshes:
+        return model
+
+    vertex_offsets = np.cumsum([0]+[len(v) for v, _ in meshes])
+    triangle_offsets = np.cumsum([0]+[len(t) for _, t in meshes])
+    instrumentation.count("triangles", triangle_offsets[-1])
+    with instrumentation.stage("z_levels"):
+        bottoms, levels = zip(*[mesh_z_levels(v, t, layer_height, adaptive) for v, t in meshes])
+
+    # Spread tasks over the objects in proportion to their triangle count
+    task_count = workers*bands_per_worker
+    tasks = []
+    for i, z_levels in enumerate(levels):
+        share = (triangle_offsets[i+1]-triangle_offsets[i])/max(triangle_offsets[-1], 1)
+        band_count = int(min(len(z_levels), max(1, round(share*task_count))))
+        for band in np.array_split(np.arange(len(z_levels)), band_count) if len(z_levels) else []:
+            tasks.append((i, band[0], band[-1]+1))
+
+    vertex_block = _shared_copy(np.concatenate([v for v, _ in meshes]))
+    triangle_block = _shared_copy(np.concatenate([t for _, t in meshes]))
+    try:
+        initargs = (vertex_block.name, int(vertex_offsets[-1]), triangle_block.name, int(triangle_offsets[-1]))
+        # slicing and contour assembly both happen in the workers
+        with instrumentation.stage("slice"), \
+                ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=initargs) as pool:
+            futures = [pool.submit(_slice_band, (vertex_offsets[i], vertex_offsets[i+1]),
+                                   (triangle_offsets[i], triangle_offsets[i+1]), levels[i][first:last])
+                       for i, first, last in tasks]
+            results = [future.result() for future in futures]
+    finally:
+        vertex_block.close()
+        vertex_block.unlink()
+        triangle_block.close()
+        triangle_block.unlink()
+
+    for i, z_levels in enumerate(levels):
+        if len(z_levels) == 0:
+            continue
+        bands = [(result, task[1]) for result, task in zip(results, tasks) if task[0] == i]
+        vertices, ring_offsets, ring_layers, segments = _merge_bands([b[0] for b in bands], [b[1] for b in bands])
+        with instrumentation.stage("write"):
+            stack = stack_from_rings(z_levels, vertices, ring_offsets, ring_layers)
+            add_slice_stack_buffers(model, stack, bottoms[i])
+        if instrumentation.enabled:
+            instrumentation.add_stack(stack, segments, len(meshes))
+    return model
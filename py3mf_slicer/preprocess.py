@@ -0,0 +1,166 @@
+from collections import OrderedDict
+import numpy as np
+
+from py3mf_slicer.buffers import get_mesh_objects, get_mesh_buffers, set_mesh_buffers, object_key
+from py3mf_slicer.index import invalidate_layer_index
+
+# Mesh cleanup before slicing, all in bulk array operations: vertices are
+# welded by hashing their coordinates on tol grids, triangles that lost a
+# corner to the weld or repeat another triangle are removed, and every
+# edge is counted to find open (one triangle) and non-manifold (more than
+# two triangles) edges. Results are cached by the content of the mesh.
+
+# Number of preprocessed meshes kept in the cache
+CACHE_SIZE = 64
+
+_cache = OrderedDict()
+
+def _cells(keys):
+    """ Cell number of every row of integer grid keys """
+    keys = np.ascontiguousarray(keys, dtype=np.int64)
+    keys = keys-keys.min(axis=0)
+    extent = keys.max(axis=0)+1
+    if np.prod(extent.astype(np.float64)) < 2**62:
+        # linear cell numbers make np.unique a plain integer sort
+        rows = keys[:, 0]
+        for axis in range(1, keys.shape[1]):
+            rows = rows*extent[axis]+keys[:, axis]
+    else:
+        # one void scalar per row
+        rows = keys.view(np.dtype((np.void, keys.dtype.itemsize*keys.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+def weld_vertices(vertices, tol=1e-5):
+    """
+    Merge vertices closer than tol/2 along every axis, and vertices
+    sharing a cell of the tol grid, transitively. Returns (welded, remap)
+    with welded[remap] approximating vertices;
+    welded vertices keep the coordinates of their first occurrence and
+    are numbered in that order.
+
+    A single tol grid splits close vertices on both sides of a cell
+    border, so the cells of the 8 grids shifted by half a cell along any
+    axes are merged as well: two such vertices always share a cell in one
+    of them.
+    """
+    vertices = np.asarray(vertices)
+    if len(vertices) == 0:
+        return vertices.reshape(0, 3), np.zeros(0, dtype=np.int64)
+    scaled = np.ascontiguousarray(vertices, dtype=np.float64)/tol
+    # exact copies (most corners of an unwelded STL) only take part once,
+    # labelled with their smallest vertex id
+    rows = scaled.view(np.dtype((np.void, scaled.itemsize*scaled.shape[1]))).ravel()
+    _, first, copies = np.unique(rows, return_index=True, return_inverse=True)
+    points, labels = scaled[first], first
+
+    # propagate the smallest label through shared cells of the unshifted and
+    # the 7 shifted grids until stable
+    shifts = [np.array(shift) for shift in np.ndindex(2, 2, 2)]
+    changed = True
+    while changed:
+        changed = False
+        for shift in shifts:
+            _, cells = _cells(np.floor(points+shift/2))
+            smallest = np.full(cells.max()+1, len(vertices))
+            np.minimum.at(smallest, cells, labels)
+            merged = smallest[cells]
+            if np.any(merged != labels):
+                changed = True
+                labels = merged
+    # labels are the first vertex of each cluster, renumber in that order
+    roots, remap = np.unique(labels, return_inverse=True)
+    return vertices[roots], remap.ravel()[copies.ravel()]
+
+def clean_triangles(triangles):
+    """
+    Drop degenerate triangles (a repeated corner) and duplicates (the same
+    three corners in any order, the first one is kept). Returns
+    (triangles, degenerate, duplicate) with the numbers removed.
+    """
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    corners = np.sort(triangles, axis=1)
+    valid = (corners[:, 0] != corners[:, 1]) & (corners[:, 1] != corners[:, 2])
+    kept = np.flatnonzero(valid)
+    corners = np.ascontiguousarray(corners[kept].astype(np.int64))
+    rows = corners.view(np.dtype((np.void, 3*corners.dtype.itemsize))).ravel()
+    _, first = np.unique(rows, return_index=True)
+    kept = kept[np.sort(first)]
+    return triangles[kept], len(triangles)-int(valid.sum()), int(valid.sum())-len(kept)
+
+def edge_report(triangles):
+    """
+    (open_edges, non_manifold_edges) as (K, 2) sorted vertex index pairs of
+    the edges used by one triangle and by more than two triangles.
+    """
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    edges = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    if len(edges) == 0:
+        return edges, edges
+    edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+    starts = np.flatnonzero(np.r_[True, np.any(edges[1:] != edges[:-1], axis=1)])
+    counts = np.diff(np.r_[starts, len(edges)])
+    unique = edges[starts]
+    return unique[counts == 1], unique[counts > 2]
+
+def preprocess_mesh(vertices, triangles, tol=1e-5):
+    """
+    Weld, clean and check one mesh. Returns (vertices, triangles, report),
+    report being a dict of counts plus the open and non-manifold edges
+    (indices into the returned vertices).
+    """
+    welded, remap = weld_vertices(vertices, tol)
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    cleaned, degenerate, duplicate = clean_triangles(remap[triangles])
+    used = np.zeros(len(welded), dtype=bool)
+    used[cleaned.ravel()] = True
+    if not used.all():
+        # vertices only referenced by removed triangles
+        renumber = np.cumsum(used)-1
+        welded, cleaned = welded[used], renumber[cleaned]
+    open_edges, non_manifold_edges = edge_report(cleaned)
+    report = {
+        "vertices_in": len(vertices),
+        "vertices": len(welded),
+        "triangles_in": len(triangles),
+        "triangles": len(cleaned),
+        "degenerate": degenerate,
+        "duplicate": duplicate,
+        "open_edges": open_edges,
+        "non_manifold_edges": non_manifold_edges,
+        "watertight": len(open_edges) == 0 and len(non_manifold_edges) == 0,
+    }
+    return welded, cleaned.astype(np.uint32), report
+
+def preprocess_buffers(vertices, triangles, tol=1e-5):
+    """ preprocess_mesh through the cache, keyed by the mesh content and tol """
+    key = (object_key(vertices, triangles), tol)
+    result = _cache.get(key)
+    if result is None:
+        result = preprocess_mesh(vertices, triangles, tol)
+        _cache[key] = result
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return result
+
+def clear_cache():
+    _cache.clear()
+
+def preprocess_model(model, tol=1e-5, write=True):
+    """
+    Preprocess every mesh object of a model and return one report per
+    mesh object. With write=True the cleaned geometry replaces that of
+    the mesh objects.
+    """
+    reports = []
+    for mesh_object in get_mesh_objects(model):
+        vertices, triangles = get_mesh_buffers(mesh_object)
+        welded, cleaned, report = preprocess_buffers(vertices, triangles, tol)
+        if write and (len(welded) != len(vertices) or len(cleaned) != len(triangles)):
+            set_mesh_buffers(mesh_object, welded, cleaned)
+        reports.append(report)
+    if write:
+        invalidate_layer_index(model)
+    return reports
@@ -0,0 +1,180 @@
+import os
+import zlib
+import struct
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from py3mf_slicer.index import get_layer_index
+from py3mf_slicer.hatch import ring_edges, scanline_segments
+
+# Rasterization of slices into 8 bit coverage bitmaps for mask based
+# machines (DLP, binder jetting). The ring edges are cut with one
+# horizontal scanline per (sub)pixel row in a single vectorised pass, the
+# crossings are paired even-odd (hatch.scanline_segments) and the spans
+# are filled with a difference array and a cumulative sum per row. With
+# supersample s every pixel is s x s sub pixels and gets their mean.
+# Rows are processed in blocks so a huge supersampled layer never has to
+# exist in memory at once. Image row 0 is the top (largest y) of the grid.
+
+# Sub pixels per block of rows
+BLOCK_PIXELS = 1 << 24
+
+class RasterGrid:
+    """
+    Pixel grid of a raster: origin is the (x, y) lower left corner, shape
+    (rows, columns) and pixel_size the pixel edge length.
+    """
+
+    def __init__(self, origin, shape, pixel_size):
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.shape = tuple(int(n) for n in shape)
+        self.pixel_size = float(pixel_size)
+
+    @classmethod
+    def from_bounds(cls, bounds, pixel_size, margin=0.0):
+        """ Grid covering bounds (xmin, xmax, ymin, ymax) plus margin on every side """
+        xmin, xmax, ymin, ymax = bounds
+        origin = np.array([xmin-margin, ymin-margin])
+        size = np.array([xmax-xmin, ymax-ymin])+2*margin
+        columns, rows = np.maximum(np.ceil(size/pixel_size-1e-9).astype(np.int64), 1)
+        return cls(origin, (rows, columns), pixel_size)
+
+    def __repr__(self):
+        return f"RasterGrid(origin={tuple(self.origin.tolist())}, shape={self.shape}, pixel_size={self.pixel_size})"
+
+def _fill_spans(x0, x1, k, rows, columns):
+    """ 0/1 mask of spans [x0, x1) on rows k, pixel c covered when c <= x < c+1 has its center inside """
+    c0 = np.clip(np.ceil(x0-0.5), 0, columns).astype(np.int64)
+    c1 = np.clip(np.ceil(x1-0.5), 0, columns).astype(np.int64)
+    width = columns+1
+    size = rows*width
+    diff = np.bincount(k*width+c0, minlength=size)-np.bincount(k*width+c1, minlength=size)
+    return np.cumsum(diff.reshape(rows, width)[:, :columns], axis=1) > 0
+
+def slice_spans(vertices, indices, offsets, grid, supersample=1):
+    """
+    Filled spans of one slice on the supersampled grid: (x0, x1, k) in
+    sub pixel units, k being the sub pixel row counted from the grid
+    bottom, sorted by k.
+    """
+    if len(offsets) < 2:
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64)
+    starts, ends = ring_edges(vertices, indices, offsets)
+    sub = grid.pixel_size/supersample
+    # sub pixel centers sit on integer coordinates
+    starts = (starts-grid.origin)/sub-0.5
+    ends = (ends-grid.origin)/sub-0.5
+    x0, x1, k = scanline_segments(starts, ends, 1.0)
+    order = np.argsort(k, kind="stable")
+    return x0[order]+0.5, x1[order]+0.5, k[order]
+
+def rasterize_slices(slices, grid, supersample=1):
+    """
+    uint8 coverage image (grid.shape, row 0 at the top) of the union of
+    slices, given as (vertices, indices, offsets) buffers. Every slice is
+    filled even-odd on its own, overlapping parts stay filled.
+    """
+    rows, columns = grid.shape
+    s = int(supersample)
+    image = np.zeros(grid.shape, dtype=np.uint8)
+    spans = [slice_spans(*buffers, grid, s) for buffers in slices]
+    block = max(1, BLOCK_PIXELS//(columns*s*s))
+    for first in range(0, rows, block):
+        last = min(first+block, rows)
+        coverage = None
+        for x0, x1, k in spans:
+            lo, hi = np.searchsorted(k, [first*s, last*s])
+            if lo == hi:
+                continue
+            mask = _fill_spans(x0[lo:hi], x1[lo:hi], k[lo:hi]-first*s, (last-first)*s, columns*s)
+            coverage = mask if coverage is None else coverage | mask
+        if coverage is None:
+            continue
+        counts = coverage.reshape(last-first, s, columns, s).sum(axis=(1, 3), dtype=np.int64)
+        image[rows-last:rows-first] = ((counts*255+(s*s)//2)//(s*s))[::-1]
+    return image
+
+def write_png(path, image):
+    """ Write a (rows, columns) uint8 array as a grayscale PNG, (rows, columns, 3) as RGB """
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    rows, columns = image.shape[:2]
+    color_type = 2 if image.ndim == 3 else 0
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data))+kind+data+struct.pack(">I", zlib.crc32(kind+data) & 0xffffffff)
+
+    # filter type 0 (none) in front of every row
+    raw = np.zeros((rows, image[0].size+1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(rows, -1)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", columns, rows, 8, color_type, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+def _rasterize_layers(jobs, grid, supersample, out, directory):
+    images = np.lib.format.open_memmap(out, mode="r+") if out is not None else None
+    results = []
+    for position, layer, slices in jobs:
+        image = rasterize_slices(slices, grid, supersample)
+        if directory is not None:
+            write_png(os.path.join(directory, f"layer_{layer:05d}.png"), image)
+        if images is not None:
+            images[position] = image
+        elif directory is None:
+            results.append(image)
+    if images is not None:
+        images.flush()
+    return results
+
+def rasterize_model(model, pixel_size, supersample=1, grid=None, margin=0.0, layers=None, out=None,
+                    directory=None, workers=None, chunk_size=16):
+    """
+    Rasterize the layers (all by default) of a sliced model into uint8
+    coverage bitmaps of pixel_size pixels, anti-aliased with supersample x
+    supersample sub pixels. The grid defaults to the contour bounds plus
+    margin.
+
+    out is the path of a .npy file the (layers, rows, columns) stack is
+    written to as a memory map, directory gets one PNG per layer
+    (layer_00000.png, ...). Without either the images are returned in
+    memory. Layers are rasterized in chunks on a process pool when
+    workers > 1. Returns (images, grid), images being the in-memory
+    array, the opened memory map or None when only PNGs were written.
+    """
+    index = get_layer_index(model)
+    layers = list(range(index.layer_count) if layers is None else layers)
+    jobs = []
+    lower, upper = np.full(2, np.inf), np.full(2, -np.inf)
+    for position, layer in enumerate(layers):
+        slices = [buffers for buffers in index.get_layer(layer) if buffers is not None]
+        for vertices, _, _ in slices:
+            if len(vertices):
+                lower = np.minimum(lower, vertices.min(axis=0))
+                upper = np.maximum(upper, vertices.max(axis=0))
+        jobs.append((position, layer, slices))
+    if grid is None:
+        if not np.all(np.isfinite(lower)):
+            lower, upper = np.zeros(2), np.full(2, pixel_size)
+        grid = RasterGrid.from_bounds((lower[0], upper[0], lower[1], upper[1]), pixel_size, margin)
+
+    if out is not None:
+        np.lib.format.open_memmap(out, mode="w+", dtype=np.uint8, shape=(len(layers),)+grid.shape).flush()
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    chunks = [jobs[i:i+chunk_size] for i in range(0, len(jobs), chunk_size)]
+    arguments = [grid, supersample, out, directory]
+
+    workers = workers or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as pool:
+            results = list(pool.map(_rasterize_layers, chunks, *([argument]*len(chunks) for argument in arguments)))
+    else:
+        results = [_rasterize_layers(chunk, *arguments) for chunk in chunks]
+
+    if out is not None:
+        return np.lib.format.open_memmap(out, mode="r+"), grid
+    if directory is not None:
+        return None, grid
+    images = [image for chunk_results in results for image in chunk_results]
+    return np.stack(images) if images else np.zeros((0,)+grid.shape, dtype=np.uint8), grid
@@ -1,18 +1,19 @@
 import lib3mf
 import pyvista as pv
-from py3mf_slicer.get_items import get_pyvista_meshes
-from ctypes import c_float, c_uint32
+from py3mf_slicer.get_items import get_pyvista_meshes, to_lib3mf_position2D
+from py3mf_slicer.buffers import (get_mesh_objects, get_mesh_buffers, set_mesh_buffers, get_slice_stacks,
+                                  get_slice_stack_buffers, add_slice_stack_buffers, stack_from_rings)
+from py3mf_slicer.sweep import mesh_z_levels, sweep_slice
+from py3mf_slicer.contours import assemble_contours, chain_segments, orient_nested_rings
+from py3mf_slicer.parallel import slice_model_parallel
+from py3mf_slicer.banded import slice_model_banded
+from py3mf_slicer.instancing import find_instances, translate_stack
+from py3mf_slicer.preprocess import preprocess_model
+from py3mf_slicer.index import invalidate_layer_index
+from py3mf_slicer.instrument import DISABLED
 import numpy as np
-import networkx as nx
 import math
 
-def to_lib3mf_position2D(positions):
-    lib3mf_positions = []
-    for row in positions:
-        position = lib3mf.Position2D((c_float * 2)(row[0], row[1]))
-        lib3mf_positions.append(position)
-    return lib3mf_positions
-
 def identify_pv_polygons(arr):
     from collections import defaultdict, deque
     # Create a graph from the array
@@ -42,28 +43,17 @@ def identify_pv_polygons(arr):
                 circles.append(circle)
     return circles
 
-def identify_pv_polygons2(connections):
-    # Create a graph from the connections
-    G = nx.Graph()
-    G.add_edges_from(connections)
-    
-    # Find all connected components in the graph
-    connected_components = list(nx.connected_components(G))
-    
-    sorted_entities = []
-    
-    for component in connected_components:
-        # Create a subgraph for each component
-        subgraph = G.subgraph(component)
-        
-        # Find a path that visits all nodes in the subgraph
-        path = list(nx.dfs_preorder_nodes(subgraph))
-        
-        # Append the sorted path to the result
-        sorted_entities.append(path)
-    
-    return sorted_entities
-    
+def identify_pv_polygons2(connections, points=None):
+    # Chain undirected line segments into closed rings of point ids. When the
+    # points are given the rings are oriented by nesting depth, outer
+    # contours counter clockwise and holes clockwise.
+    connections = np.asarray(connections).reshape(-1, 2)
+    ring_points, ring_offsets = chain_segments(connections[:, 0], connections[:, 1], directed=False)
+    if points is not None:
+        ring_layers = np.zeros(len(ring_offsets)-1, dtype=np.int64)
+        ring_points = orient_nested_rings(ring_points, ring_offsets, np.asarray(points)[:, :2], ring_layers)
+    return np.split(ring_points, ring_offsets[1:-1]) if len(ring_offsets) > 1 else []
+
 def slice_pv_mesh(mesh, layer_height):
     z_min, z_max = mesh.bounds[4], mesh.bounds[5]
     # Create a MultiBlock to store all slices
@@ -79,27 +69,150 @@ def slice_pv_mesh(mesh, layer_height):
 
     return slices
 
-def slice_model(model, layer_height):
+def slice_model(model, layer_height, backend="vtk", workers=None, min_layer_height=None, cusp_height=None,
+                instrumentation=None, memory_budget=None, instancing=False, preprocess=False):
+    # workers > 1 spreads the sweep backend over a process pool
+    # min_layer_height switches to adaptive layers: every layer is between
+    # min_layer_height and layer_height thick, chosen from the surface slope
+    # so the stair step cusp stays below cusp_height (see sweep.adaptive_z_levels)
+    # instrumentation is an optional instrument.Instrumentation collecting
+    # stage timings, counters and per-layer statistics
+    # memory_budget (bytes) slices in z-bands that fit the budget and writes
+    # layers as they are finished (see banded.slice_model_banded)
+    # instancing slices identical mesh objects (up to an xy translation) once
+    # and moves copies of the contours (see slice_model_instanced)
+    # preprocess welds vertices and removes degenerate and duplicate triangles
+    # of every mesh object first (see preprocess.preprocess_model); a float
+    # is used as the welding tolerance
+    if backend not in ("vtk", "sweep"):
+        raise ValueError(f"Unknown slicing backend '{backend}', expected 'vtk' or 'sweep'")
+    if workers is not None and workers > 1 and backend != "sweep":
+        raise ValueError("Parallel slicing requires the 'sweep' backend")
+    adaptive = None
+    if min_layer_height is not None:
+        if backend != "sweep":
+            raise ValueError("Adaptive layer heights require the 'sweep' backend")
+        if not 0 < min_layer_height <= layer_height:
+            raise ValueError("min_layer_height must be in (0, layer_height]")
+        adaptive = (min_layer_height, cusp_height)
+    if memory_budget is not None:
+        if backend != "sweep":
+            raise ValueError("Bounded memory slicing requires the 'sweep' backend")
+        if workers is not None and workers > 1:
+            raise ValueError("memory_budget can not be combined with parallel slicing")
+    if preprocess:
+        preprocess_model(model, tol=1e-5 if preprocess is True else preprocess)
+    invalidate_layer_index(model)
+    if instancing:
+        return slice_model_instanced(model, layer_height, backend=backend, workers=workers,
+                                     min_layer_height=min_layer_height, cusp_height=cusp_height,
+                                     instrumentation=instrumentation, memory_budget=memory_budget)
+    instrumentation = instrumentation or DISABLED
+    if memory_budget is not None:
+        return slice_model_banded(model, layer_height, memory_budget, adaptive=adaptive,
+                                  instrumentation=instrumentation)
+    if workers is not None and workers > 1:
+        return slice_model_parallel(model, layer_height, workers=workers, adaptive=adaptive,
+                                    instrumentation=instrumentation)
+    if backend == "vtk":
+        return slice_model_vtk(model, layer_height, instrumentation=instrumentation)
+    return slice_model_sweep(model, layer_height, adaptive=adaptive, instrumentation=instrumentation)
+
+def slice_mesh_buffers(vertices, triangles, layer_height, **options):
+    """
+    Slice one mesh given as (N, 3) vertices and (M, 3) triangles with
+    slice_model(**options). Returns (stack dict, z_bottom) in the
+    buffers.get_slice_stack_buffers layout, or None when nothing is cut.
+    """
+    wrapper = lib3mf.get_wrapper()
+    model = wrapper.CreateModel()
+    mesh_object = model.AddMeshObject()
+    set_mesh_buffers(mesh_object, vertices, triangles)
+    model.AddBuildItem(mesh_object, wrapper.GetIdentityTransform())
+    slicestacks = get_slice_stacks(slice_model(model, layer_height, **options))
+    if not slicestacks:
+        return None
+    return get_slice_stack_buffers(slicestacks[0]), slicestacks[0].GetBottomZ()
+
+def slice_model_instanced(model, layer_height, tol=1e-4, **options):
+    """
+    slice_model for plates of duplicated parts. Mesh objects with the same
+    triangles and vertices equal up to an xy translation (within tol) are
+    sliced once; the other copies get that slice stack moved in bulk. A
+    mesh object used by several build items already has a single stack.
+    Stacks are added in mesh object order, as slice_model does.
+    """
+    meshes = [get_mesh_buffers(mesh_object) for mesh_object in get_mesh_objects(model)]
+    representatives, origins = find_instances(meshes, tol)
+    sliced = {}
+    for i in np.unique(representatives[representatives >= 0]):
+        sliced[i] = slice_mesh_buffers(*meshes[i], layer_height, **options)
+    for i, representative in enumerate(representatives):
+        if representative < 0 or sliced[representative] is None:
+            continue
+        stack, z_bottom = sliced[representative]
+        if representative != i:
+            stack = translate_stack(stack, origins[i]-origins[representative])
+        add_slice_stack_buffers(model, stack, z_bottom)
+    return model
+
+def slice_model_vtk(model, layer_height, instrumentation=DISABLED):
     model_sliced = model #copy.deepcopy(model)
-    pv_meshes = get_pyvista_meshes(model_sliced)
+    with instrumentation.stage("meshes"):
+        pv_meshes = get_pyvista_meshes(model_sliced)
     for mesh in pv_meshes:
-        slices = slice_pv_mesh(mesh, layer_height)
+        instrumentation.count("triangles", mesh.n_cells)
+        with instrumentation.stage("slice"):
+            slices = slice_pv_mesh(mesh, layer_height)
         z_min = slices[0].points[0][2]
         z_max = slices[-1].points[0][2]
 
-        slicestack = model_sliced.AddSliceStack(z_min-layer_height)
-        for pv_slice in slices:
-            slice = slicestack.AddSlice(pv_slice.points[0][2])
-            vertices = pv_slice.points[:, :2]
-            positions = to_lib3mf_position2D(vertices)
-            slice.SetVertices(positions)
-            pv_lines = pv_slice.lines.reshape(-1, 3)[:, 1:]
-            #sorted_lines = identify_pv_polygons(pv_lines)
-            sorted_lines = identify_pv_polygons2(pv_lines)
+        # Chain the lines of all slices in one batch with stack wide point ids
+        with instrumentation.stage("contours"):
+            point_offsets = np.cumsum([0]+[pv_slice.n_points for pv_slice in slices])
+            connections = np.concatenate([pv_slice.lines.reshape(-1, 3)[:, 1:]+offset
+                                          for pv_slice, offset in zip(slices, point_offsets)])
+            points = np.concatenate([pv_slice.points for pv_slice in slices])
+            ring_points, ring_offsets = chain_segments(connections[:, 0], connections[:, 1], directed=False)
+            ring_layers = np.searchsorted(point_offsets, ring_points[ring_offsets[:-1]], side="right")-1
+            ring_points = orient_nested_rings(ring_points, ring_offsets, points[:, :2], ring_layers)
+            layer_rings = np.searchsorted(ring_layers, np.arange(len(slices)+1))
 
-            for sorted_line in sorted_lines:
-                sorted_line = np.array(sorted_line)
-                lines = (c_uint32 * sorted_line.size)(*sorted_line.flatten())
-                slice.AddPolygon(lines)
+        # Polygon indices stay local to the points of their own slice
+        ring_lengths = np.diff(ring_offsets)
+        stack = {
+            "z": np.array([pv_slice.points[0][2] for pv_slice in slices]),
+            "vertices": points[:, :2],
+            "vertex_offsets": point_offsets,
+            "indices": ring_points-np.repeat(point_offsets[ring_layers], ring_lengths),
+            "polygon_offsets": ring_offsets,
+            "slice_polygon_offsets": layer_rings,
+        }
+        with instrumentation.stage("write"):
+            add_slice_stack_buffers(model_sliced, stack, z_min-layer_height)
+        if instrumentation.enabled:
+            instrumentation.add_stack(stack, [pv_slice.n_lines for pv_slice in slices], len(pv_meshes))
     return model_sliced
 
+def slice_model_sweep(model, layer_height, adaptive=None, instrumentation=DISABLED):
+    model_sliced = model
+    with instrumentation.stage("meshes"):
+        meshes = [get_mesh_buffers(mesh_object) for mesh_object in get_mesh_objects(model_sliced)]
+    for points, triangles in meshes:
+        if len(points) == 0:
+            continue
+        instrumentation.count("triangles", len(triangles))
+        with instrumentation.stage("z_levels"):
+            z_bottom, z_levels = mesh_z_levels(points, triangles, layer_height, adaptive)
+        if len(z_levels) == 0:
+            continue
+        with instrumentation.stage("slice"):
+            layer_ids, starts, ends = sweep_slice(points, triangles, z_levels)
+        with instrumentation.stage("contours"):
+            vertices, ring_offsets, ring_layers = assemble_contours(layer_ids, starts, ends)
+        with instrumentation.stage("write"):
+            stack = stack_from_rings(z_levels, vertices, ring_offsets, ring_layers)
+            add_slice_stack_buffers(model_sliced, stack, z_bottom)
+        if instrumentation.enabled:
+            instrumentation.add_stack(stack, np.bincount(layer_ids, minlength=len(z_levels)), len(meshes))
+    return model_sliced
@@ -0,0 +1,150 @@
+import math
+import numpy as np
+
+from py3mf_slicer.contours import expand_ranges
+
+def get_z_levels(z_min, z_max, layer_height):
+    """
+    Slice heights used for a mesh spanning [z_min, z_max]. Follows the same
+    grid as slice.slice_pv_mesh so both backends produce identical z tops.
+    """
+    z_floor = math.floor(z_min/layer_height)*layer_height
+    z_floor = max(z_floor, 0)
+    levels = []
+    z = z_floor+layer_height
+    while z < z_max:
+        levels.append(z)
+        z = z + layer_height
+    return np.array(levels, dtype=float)
+
+def sweep_slice(points, triangles, z_levels):
+    """
+    Intersect a triangle mesh with every plane in z_levels in a single pass.
+
+    The triangle z-extents are sorted once and matched against the (sorted)
+    levels, so each triangle is only intersected with the planes it actually
+    spans. A plane at z cuts a triangle when z_min < z <= z_max; vertices with
+    z >= plane count as above it, which gives exactly one segment per cut
+    triangle and drops faces lying in the plane.
+
+    Segments follow the triangle winding: for an outward oriented mesh outer
+    contours run counter clockwise and holes clockwise. Points on a shared
+    edge are computed the same way from both triangles, so neighbouring
+    segments meet in bitwise identical endpoints.
+
+    Returns (layer_ids, starts, ends) with layer_ids indexing z_levels in
+    ascending order and starts/ends as (S, 2) xy arrays.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    z_levels = np.asarray(z_levels, dtype=np.float64)
+    empty = (np.zeros(0, dtype=np.int64), np.zeros((0, 2)), np.zeros((0, 2)))
+    if len(triangles) == 0 or len(z_levels) == 0:
+        return empty
+
+    tri_z = points[triangles, 2]
+    z_lo = tri_z.min(axis=1)
+    z_hi = tri_z.max(axis=1)
+    order = np.argsort(z_lo, kind="stable")
+    first = np.searchsorted(z_levels, z_lo[order], side="right")
+    last = np.searchsorted(z_levels, z_hi[order], side="right")
+    counts = last - first
+    total = int(counts.sum())
+    if total == 0:
+        return empty
+
+    # one row per (triangle, level) pair that intersects
+    tri = np.repeat(order, counts)
+    layer = expand_ranges(first, counts)
+    by_layer = np.argsort(layer, kind="stable")
+    tri = tri[by_layer]
+    layer = layer[by_layer]
+
+    corners = triangles[tri]
+    z = z_levels[layer]
+    above = points[corners, 2] >= z[:, None]
+    above_next = np.roll(above, -1, axis=1)
+    rows = np.arange(total)
+
+    # edge k runs from corner k to corner k+1; 'up' goes below -> above
+    k_up = np.argmax(~above & above_next, axis=1)
+    k_down = np.argmax(above & ~above_next, axis=1)
+    up_lo = corners[rows, k_up]
+    up_hi = corners[rows, (k_up+1) % 3]
+    down_lo = corners[rows, (k_down+1) % 3]
+    down_hi = corners[rows, k_down]
+
+    def edge_point(lo, hi):
+        p_lo = points[lo]
+        p_hi = points[hi]
+        t = (z - p_lo[:, 2])/(p_hi[:, 2] - p_lo[:, 2])
+        return p_lo[:, :2] + t[:, None]*(p_hi[:, :2] - p_lo[:, :2])
+
+    return layer, edge_point(down_lo, down_hi), edge_point(up_lo, up_hi)
+
+def adaptive_z_levels(points, triangles, min_height, max_height, cusp_height=None):
+    """
+    Slice heights with a variable layer thickness between min_height and
+    max_height. A surface with unit normal n allows a thickness of
+    cusp_height/|n_z| (the stair step cusp stays below cusp_height), so
+    vertical walls get max_height and flat or shallow surfaces get thin
+    layers. cusp_height defaults to min_height.
+
+    The allowed thickness is rasterised onto min_height sized z-bins in
+    bulk; every layer then takes the smallest value of the bins it covers.
+    Returns (z_bottom, z_levels) with the first layer starting at the
+    bottom of the mesh.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    cusp_height = min_height if cusp_height is None else cusp_height
+    z_min, z_max = float(points[:, 2].min()), float(points[:, 2].max())
+
+    corners = points[triangles]
+    normals = np.cross(corners[:, 1]-corners[:, 0], corners[:, 2]-corners[:, 0])
+    length = np.linalg.norm(normals, axis=1)
+    n_z = np.abs(normals[:, 2])/np.where(length > 0, length, 1.0)
+    with np.errstate(divide="ignore"):
+        allowed = np.clip(np.where(n_z > 0, cusp_height/n_z, max_height), min_height, max_height)
+
+    bin_count = max(1, int(math.ceil((z_max-z_min)/min_height)))
+    limit = np.full(bin_count, float(max_height))
+    restricting = np.flatnonzero(allowed < max_height)
+    tri_z = corners[restricting, :, 2]
+    first = np.clip(np.floor((tri_z.min(axis=1)-z_min)/min_height).astype(np.int64), 0, bin_count-1)
+    last = np.clip(np.ceil((tri_z.max(axis=1)-z_min)/min_height).astype(np.int64), first+1, bin_count)
+    counts = last-first
+    bins = expand_ranges(first, counts)
+    np.minimum.at(limit, bins, np.repeat(allowed[restricting], counts))
+
+    def bin_of(z):
+        return min(int((z-z_min)/min_height), bin_count-1)
+
+    levels = []
+    z = z_min
+    while True:
+        first_bin = bin_of(z)
+        thickness = limit[first_bin]
+        # shrink until the layer respects every bin it covers
+        while True:
+            covered = limit[first_bin:bin_of(z+thickness*(1-1e-9))+1].min()
+            if covered >= thickness:
+                break
+            thickness = covered
+        z = z+thickness
+        if z >= z_max:
+            break
+        levels.append(z)
+    return z_min, np.array(levels, dtype=float)
+
+def mesh_z_levels(points, triangles, layer_height, adaptive=None):
+    """
+    (z_bottom, z_levels) for one mesh. Uniform layers follow get_z_levels;
+    adaptive is an optional (min_height, cusp_height) pair switching to
+    adaptive_z_levels with layer_height as the maximum thickness.
+    """
+    if adaptive is None:
+        z_levels = get_z_levels(float(points[:, 2].min()), float(points[:, 2].max()), layer_height)
+        return (z_levels[0]-layer_height if len(z_levels) else 0.0), z_levels
+    min_height, cusp_height = adaptive
+    return adaptive_z_levels(points, triangles, min_height, layer_height, cusp_height)
@@ -1,18 +1,109 @@
-import py3mf_slicer.get_items as get_items
+import lib3mf
+import numpy as np
 
-def transform_model(model, item, movement = (0, 0, 0), rotation=(0, 0, 0), scale=(1, 1, 1)):
-    meshes = get_items.get_pyvista_meshes(model)
-    mesh = meshes[item]
-    transformed_mesh = mesh.translate([movement[0], movement[1], movement[2]])
-    transformed_mesh = transformed_mesh.rotate_x(rotation[0]).rotate_y(rotation[1]).rotate_z(rotation[2])
-    transformed_mesh = transformed_mesh.scale([scale[0], scale[1], scale[2]])
-
-    meshes[item] = transformed_mesh
-    import pyvista as pv
-    plotter = pv.Plotter()
-    for slice in meshes:
-        plotter.add_mesh(slice, color='green')
-    plotter.show()
-    transformed_model = get_items.get_py3mf_from_pyvista(meshes)
+from py3mf_slicer.buffers import (get_mesh_objects, get_mesh_buffers, set_mesh_buffers, get_build_items,
+                                  transform_to_array, array_to_transform)
+
+# Matrices follow the lib3mf 4x3 layout: a point p maps to p @ M[:3] + M[3].
+# Build item transforms only change where an object is placed; slice_model
+# works on the object coordinates, so use transform_mesh_object to move the
+# geometry itself.
+
+def _to_4x4(matrix):
+    # column vector form, so that compose is a plain matrix product
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, 4, 3)
+    full = np.zeros((len(matrix), 4, 4))
+    full[:, :3, :3] = np.transpose(matrix[:, :3], (0, 2, 1))
+    full[:, :3, 3] = matrix[:, 3]
+    full[:, 3, 3] = 1
+    return full
+
+def _from_4x4(full):
+    matrix = np.empty((len(full), 4, 3))
+    matrix[:, :3] = np.transpose(full[:, :3, :3], (0, 2, 1))
+    matrix[:, 3] = full[:, :3, 3]
+    return matrix
+
+def compose(*matrices):
+    """ One 4x3 matrix applying the given 4x3 matrices from first to last """
+    full = np.eye(4)
+    for matrix in matrices:
+        full = _to_4x4(matrix)[0] @ full
+    return _from_4x4(full[None])[0]
+
+def translation_matrix(movement):
+    matrix = np.eye(4, 3)
+    matrix[3] = movement
+    return matrix
+
+def rotation_matrix(rotation):
+    """ Rotation in degrees about x, then y, then z (as pyvista rotate_x/y/z) """
+    matrices = []
+    for axis, angle in enumerate(np.radians(rotation)):
+        c, s = np.cos(angle), np.sin(angle)
+        i, j = (axis+1) % 3, (axis+2) % 3
+        matrix = np.eye(4, 3)
+        matrix[i, i], matrix[i, j], matrix[j, i], matrix[j, j] = c, s, -s, c
+        matrices.append(matrix)
+    return compose(*matrices)
 
+def scale_matrix(scale):
+    matrix = np.eye(4, 3)
+    matrix[:3] *= np.asarray(scale, dtype=np.float64)[None, :]
+    return matrix
+
+def get_matrix(movement=(0, 0, 0), rotation=(0, 0, 0), scale=(1, 1, 1)):
+    # Same order as transform_model: translate, rotate, then scale
+    return compose(translation_matrix(movement), rotation_matrix(rotation), scale_matrix(scale))
+
+def transform_vertices(vertices, matrix):
+    """ Apply a 4x3 matrix to (N, 3) vertices """
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(4, 3)
+    return np.asarray(vertices, dtype=np.float64) @ matrix[:3] + matrix[3]
+
+def transform_mesh_object(mesh_object, matrix):
+    """
+    Bake a 4x3 matrix into the vertex buffer of a mesh object. Mirroring
+    matrices also flip the triangle winding so normals keep pointing out.
+    """
+    vertices, triangles = get_mesh_buffers(mesh_object)
+    if np.linalg.det(np.asarray(matrix, dtype=np.float64).reshape(4, 3)[:3]) < 0:
+        triangles = triangles[:, ::-1]
+    set_mesh_buffers(mesh_object, transform_vertices(vertices, matrix), triangles)
+
+def transform_build_items(model, items, matrices):
+    """
+    Apply 4x3 matrices on top of the current transforms of build items,
+    in place. items are build item indices (an int or a sequence) and
+    matrices a single (4, 3) matrix or one per item.
+    """
+    items = np.atleast_1d(items)
+    matrices = np.broadcast_to(np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 3), (len(items), 4, 3))
+    build_items = get_build_items(model)
+    current = np.array([transform_to_array(build_items[i].GetObjectTransform()) for i in items]).reshape(-1, 4, 3)
+    updated = _from_4x4(_to_4x4(matrices) @ _to_4x4(current))
+    for i, matrix in zip(items, updated):
+        build_items[i].SetObjectTransform(array_to_transform(matrix))
+    return model
+
+def set_build_item_transforms(model, items, matrices):
+    """ Replace the transforms of build items, in place """
+    items = np.atleast_1d(items)
+    matrices = np.broadcast_to(np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 3), (len(items), 4, 3))
+    build_items = get_build_items(model)
+    for i, matrix in zip(items, matrices):
+        build_items[i].SetObjectTransform(array_to_transform(matrix))
+    return model
+
+def transform_model(model, item, movement = (0, 0, 0), rotation=(0, 0, 0), scale=(1, 1, 1)):
+    # New model with the geometry of mesh object number item moved, rotated
+    # and scaled; the other meshes are copied unchanged
+    wrapper = lib3mf.get_wrapper()
+    transformed_model = wrapper.CreateModel()
+    for i, mesh_object in enumerate(get_mesh_objects(model)):
+        new_mesh_object = transformed_model.AddMeshObject()
+        set_mesh_buffers(new_mesh_object, *get_mesh_buffers(mesh_object))
+        if i == item:
+            transform_mesh_object(new_mesh_object, get_matrix(movement, rotation, scale))
+        transformed_model.AddBuildItem(new_mesh_object, wrapper.GetIdentityTransform())
     return transformed_model
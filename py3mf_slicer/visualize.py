@@ -1,6 +1,13 @@
+import os
+import sys
+import subprocess
+import numpy as np
 import pyvista as pv
+from concurrent.futures import ProcessPoolExecutor
 
 import py3mf_slicer.get_items
+from py3mf_slicer.index import get_layer_index
+from py3mf_slicer.raster import RasterGrid, rasterize_slices, write_png
 
 def get_colors():
     colors = [
@@ -32,7 +39,23 @@ def visualize_layer(pv_layer):
 
 
 
-def visualize_slices(sliced_model, show_bounds=False):
+def visualize_slices(sliced_model, show_bounds=False, merged=False, layer_stride=1, layer_range=None, decimate=None):
+    # merged=True draws one PolyData per slice stack (see
+    # get_items.slice_stack_to_pyvista), with optional level of detail
+    if merged:
+        stacks = py3mf_slicer.get_items.get_pyvista_slices(sliced_model, merged=True, layer_stride=layer_stride,
+                                                           layer_range=layer_range, decimate=decimate)
+        colors = get_colors()
+        p = pv.Plotter()
+        for i, polydata in enumerate(stacks):
+            if polydata.n_points:
+                p.add_mesh(polydata, color=colors[i % len(colors)])
+        if show_bounds:
+            p.show_bounds(grid='front', location='outer', ticks='both', all_edges=True)
+        p.enable_anti_aliasing()
+        p.show()
+        return
+
     pv_elements = py3mf_slicer.get_items.get_pyvista_slices(sliced_model)
 
     mb = pv.MultiBlock()
@@ -51,4 +74,164 @@ def visualize_slices(sliced_model, show_bounds=False):
     if show_bounds:
         p.show_bounds(grid='front', location='outer', ticks='both', all_edges=True)
     p.enable_anti_aliasing()
-    p.show()
\ No newline at end of file
+    p.show()
+
+def layer_preview_polydata(slices):
+    """
+    One flat (z = 0) PolyData with the contours of all stacks on a layer,
+    slices being (stack, (vertices, indices, offsets)) pairs. The cell
+    array "stack" holds the stack number for coloring.
+    """
+    vertex_counts = [len(buffers[0]) for _, buffers in slices]
+    polygon_counts = [len(buffers[2])-1 for _, buffers in slices]
+    index_counts = [len(buffers[1]) for _, buffers in slices]
+    index_offsets = np.cumsum([0]+index_counts)
+    stack = {
+        "z": np.zeros(len(slices)),
+        "vertices": np.concatenate([buffers[0] for _, buffers in slices]+[np.zeros((0, 2), dtype=np.float32)]),
+        "vertex_offsets": np.cumsum([0]+vertex_counts),
+        "indices": np.concatenate([buffers[1] for _, buffers in slices]+[np.zeros(0, dtype=np.uint32)]),
+        "polygon_offsets": np.concatenate([[0]]+[buffers[2][1:]+offset
+                                                 for (_, buffers), offset in zip(slices, index_offsets)]),
+        "slice_polygon_offsets": np.cumsum([0]+polygon_counts),
+    }
+    stacks = np.array([s for s, _ in slices], dtype=np.int64)
+    polydata = py3mf_slicer.get_items.slice_stack_to_pyvista(stack, layers=stacks)
+    polydata.cell_data["stack"] = polydata.cell_data["layer_id"]
+    return polydata
+
+def preview_camera(bounds, resolution, margin=0.05):
+    """
+    Top down orthographic camera showing the xy bounds (xmin, xmax, ymin,
+    ymax) in a resolution (width, height) image: (position, focal_point,
+    view_up, parallel_scale).
+    """
+    xmin, xmax, ymin, ymax = bounds
+    center = ((xmin+xmax)/2, (ymin+ymax)/2)
+    width, height = resolution
+    half_height = max((ymax-ymin)/2, (xmax-xmin)/2*height/width, 1e-6)*(1+margin)
+    return (center[0], center[1], 1.0), (center[0], center[1], 0.0), (0, 1, 0), half_height
+
+_preview = {}
+
+# matplotlib tab10, the colors of the raster previews
+PREVIEW_COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f",
+                  "#bcbd22", "#17becf")
+
+# VTK aborts the whole process when it can not get an OpenGL context, so the
+# check runs in a child process, once
+_OFFSCREEN_PROBE = ("import pyvista as pv; plotter = pv.Plotter(off_screen=True, window_size=[8, 8]); "
+                    "plotter.add_mesh(pv.Sphere()); plotter.screenshot(); plotter.close()")
+_offscreen = {}
+
+def offscreen_rendering_available():
+    """ Whether VTK can render off-screen here (OpenGL through a display, EGL or OSMesa) """
+    if "available" not in _offscreen:
+        try:
+            result = subprocess.run([sys.executable, "-c", _OFFSCREEN_PROBE], capture_output=True, timeout=120)
+            _offscreen["available"] = result.returncode == 0
+        except (OSError, subprocess.TimeoutExpired):
+            _offscreen["available"] = False
+    return _offscreen["available"]
+
+def preview_grid(camera, resolution):
+    """ raster.RasterGrid covering exactly what the preview camera shows """
+    _, focal_point, _, parallel_scale = camera
+    width, height = resolution
+    pixel_size = 2*parallel_scale/height
+    origin = (focal_point[0]-width*pixel_size/2, focal_point[1]-parallel_scale)
+    return RasterGrid(origin, (height, width), pixel_size)
+
+def _render_raster_previews(jobs, grid, background):
+    colors = np.array([pv.Color(color).int_rgb for color in PREVIEW_COLORS], dtype=np.float64)
+    for path, slices in jobs:
+        image = np.empty(grid.shape+(3,))
+        image[:] = pv.Color(background).int_rgb
+        for stack, buffers in slices:
+            alpha = rasterize_slices([buffers], grid, supersample=2)[:, :, None]/255
+            image = image*(1-alpha)+colors[stack % len(colors)]*alpha
+        write_png(path, np.round(image).astype(np.uint8))
+    return [path for path, _ in jobs]
+
+def _init_preview(resolution, camera, stack_count, background, line_width):
+    plotter = pv.Plotter(off_screen=True, window_size=list(resolution))
+    plotter.set_background(background)
+    mesh = pv.PolyData(np.zeros((2, 3), dtype=np.float32), lines=np.array([2, 0, 1]))
+    mesh.cell_data["stack"] = np.zeros(1, dtype=np.int64)
+    plotter.add_mesh(mesh, scalars="stack", cmap="tab10", clim=(0, max(stack_count-1, 1)), show_scalar_bar=False,
+                     line_width=line_width)
+    position, focal_point, view_up, parallel_scale = camera
+    plotter.camera.position = position
+    plotter.camera.focal_point = focal_point
+    plotter.camera.up = view_up
+    plotter.enable_parallel_projection()
+    plotter.camera.parallel_scale = parallel_scale
+    _preview["plotter"] = plotter
+    _preview["mesh"] = mesh
+
+def _render_previews(jobs):
+    plotter, mesh = _preview["plotter"], _preview["mesh"]
+    for path, slices in jobs:
+        mesh.copy_from(layer_preview_polydata(slices))
+        plotter.render()
+        plotter.screenshot(path)
+    return [path for path, _ in jobs]
+
+def render_layer_previews(sliced_model, directory, layers=None, resolution=(512, 512), workers=None,
+                          background="white", line_width=1.0, chunk_size=32, renderer="auto"):
+    """
+    Write an off-screen PNG preview (layer_00000.png, ...) of the given
+    layers (all by default) into directory, without opening a window.
+    The camera is framed once on the contours of all rendered layers, so
+    the images line up as a flip-book. Layers are rendered in chunks on a
+    pool of worker processes.
+
+    renderer "vtk" draws the contours with a plotter kept alive per worker
+    and needs an OpenGL context, "raster" fills the slices per stack with
+    raster.rasterize_slices and works on any machine. "auto" uses vtk when
+    off-screen rendering is available and raster otherwise.
+    Returns the written paths in layer order.
+    """
+    if renderer not in ("auto", "vtk", "raster"):
+        raise ValueError(f"Unknown preview renderer '{renderer}', expected 'auto', 'vtk' or 'raster'")
+    if renderer != "raster" and not offscreen_rendering_available():
+        if renderer == "vtk":
+            raise RuntimeError("VTK off-screen rendering is not available (no display, EGL or OSMesa), "
+                               "use renderer='raster'")
+        renderer = "raster"
+    index = get_layer_index(sliced_model)
+    layers = range(index.layer_count) if layers is None else layers
+    os.makedirs(directory, exist_ok=True)
+
+    jobs = []
+    lower, upper = np.full(2, np.inf), np.full(2, -np.inf)
+    for layer in layers:
+        slices = [(s, buffers) for s, buffers in enumerate(index.get_layer(layer)) if buffers is not None]
+        for _, (vertices, _, _) in slices:
+            if len(vertices):
+                lower = np.minimum(lower, vertices.min(axis=0))
+                upper = np.maximum(upper, vertices.max(axis=0))
+        jobs.append((os.path.join(directory, f"layer_{layer:05d}.png"), slices))
+    if not jobs:
+        return []
+    if not np.all(np.isfinite(lower)):
+        lower, upper = np.zeros(2), np.ones(2)
+    camera = preview_camera((lower[0], upper[0], lower[1], upper[1]), resolution)
+    initargs = (tuple(resolution), camera, len(index.slicestacks), background, line_width)
+    chunks = [jobs[i:i+chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    if renderer == "raster":
+        grid = preview_grid(camera, resolution)
+        if workers is not None and workers <= 1:
+            return [path for chunk in chunks for path in _render_raster_previews(chunk, grid, background)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_render_raster_previews, chunks, [grid]*len(chunks), [background]*len(chunks))
+            return [path for paths in results for path in paths]
+    if workers is not None and workers <= 1:
+        _init_preview(*initargs)
+        try:
+            return [path for chunk in chunks for path in _render_previews(chunk)]
+        finally:
+            _preview.pop("plotter").close()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_preview, initargs=initargs) as pool:
+        return [path for paths in pool.map(_render_previews, chunks) for path in paths]
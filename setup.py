@@ -9,7 +9,6 @@ setup(
         'lib3mf',
         'pyvista',
         'numpy',
-        'networkx',
         'shapely'
     ],
     entry_points={
@@ -0,0 +1,61 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.get_items
+import py3mf_slicer.sweep
+
+import numpy as np
+import pyvista as pv
+
+
+class TestAdaptive(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def test_adaptive_z_levels(self):
+        sphere = pv.Sphere(radius=10, theta_resolution=60, phi_resolution=60).translate((0, 0, 10))
+        triangles = sphere.faces.reshape(-1, 4)[:, 1:]
+        z_bottom, z_levels = py3mf_slicer.sweep.adaptive_z_levels(sphere.points, triangles, 0.05, 0.4, 0.02)
+        thickness = np.diff(z_levels, prepend=z_bottom)
+        self.assertAlmostEqual(z_bottom, sphere.bounds[4], places=5)
+        self.assertTrue(np.all(thickness >= 0.05-1e-9) and np.all(thickness <= 0.4+1e-9))
+        # thin layers at the flat poles, thick ones along the steep equator
+        self.assertAlmostEqual(thickness[0], 0.05)
+        self.assertGreater(thickness[np.searchsorted(z_levels, 10.0)], 0.3)
+        self.assertLess(z_levels[-1], sphere.bounds[5])
+
+    def test_adaptive_slicing(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend="sweep", min_layer_height=0.25)
+        z_table, _ = py3mf_slicer.get_items.get_z_table(sliced_model)
+        heights = py3mf_slicer.get_items.get_layer_heights(sliced_model)
+        self.assertEqual(len(heights), len(z_table))
+        self.assertTrue(np.all(heights > 0))
+        for layer in range(len(z_table)):
+            self.assertEqual(py3mf_slicer.get_items.get_layer_z_height(sliced_model, layer), z_table[layer])
+            geometries = py3mf_slicer.get_items.get_shapely_slice(sliced_model, layer)
+            self.assertTrue(any(g is not None and not g.is_empty for g in geometries))
+
+    def test_adaptive_slice_geometry(self):
+        # a 64 sided prism has the same cross section on every adaptive layer
+        prism = pv.Cylinder(center=(0, 0, 5), direction=(0, 0, 1), radius=5, height=10, resolution=64).triangulate()
+        model = py3mf_slicer.get_items.get_py3mf_from_arrays([(prism.points, prism.faces.reshape(-1, 4)[:, 1:])])
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend="sweep", min_layer_height=0.25)
+        area = 0.5*64*5**2*np.sin(2*np.pi/64)
+        z_table, _ = py3mf_slicer.get_items.get_z_table(sliced_model)
+        self.assertGreater(len(z_table), 5)
+        for layer in range(len(z_table)):
+            geometry, = py3mf_slicer.get_items.get_shapely_slice(sliced_model, layer)
+            self.assertAlmostEqual(geometry.area, area, places=3)
+            np.testing.assert_allclose(geometry.bounds, (-5, -5, 5, 5), atol=1e-3)
+
+    def test_adaptive_requires_sweep(self):
+        model = py3mf_slicer.load.load_file(self.geometries[0])
+        with self.assertRaises(ValueError):
+            py3mf_slicer.slice.slice_model(model, 1, min_layer_height=0.25)
+
+if __name__ == '__main__':
+    unittest.main()
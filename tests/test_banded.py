@@ -0,0 +1,47 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.banded
+import py3mf_slicer.buffers
+import py3mf_slicer.instrument
+
+import numpy as np
+
+
+class TestBanded(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def stacks(self, model):
+        return [py3mf_slicer.buffers.get_slice_stack_buffers(s) for s in py3mf_slicer.buffers.get_slice_stacks(model)]
+
+    def test_matches_sweep(self):
+        expected = py3mf_slicer.slice.slice_model(py3mf_slicer.load.load_files(self.geometries), 0.5, backend="sweep")
+        instrumentation = py3mf_slicer.instrument.Instrumentation()
+        banded = py3mf_slicer.slice.slice_model(py3mf_slicer.load.load_files(self.geometries), 0.5, backend="sweep",
+                                                memory_budget=100*1024, instrumentation=instrumentation)
+        for stack, expected_stack in zip(self.stacks(banded), self.stacks(expected)):
+            for key, value in expected_stack.items():
+                np.testing.assert_array_equal(stack[key], value)
+        self.assertEqual(instrumentation.counters["layers"], sum(len(s["z"]) for s in self.stacks(expected)))
+
+    def test_split_bands(self):
+        segments = np.array([10, 10, 500, 10, 10, 10])
+        bands = py3mf_slicer.banded.split_bands(segments, 25*py3mf_slicer.banded.BYTES_PER_SEGMENT)
+        self.assertEqual(bands, [(0, 2), (2, 3), (3, 5), (5, 6)])
+
+    def test_band_budget_counts_vertices(self):
+        self.assertEqual(py3mf_slicer.banded.band_budget(10000, 100), 10000-100*py3mf_slicer.banded.BYTES_PER_VERTEX)
+        self.assertEqual(py3mf_slicer.banded.band_budget(1000, 100), 0)
+        # a budget the vertices alone use up still slices, one layer per band
+        expected = py3mf_slicer.slice.slice_model(py3mf_slicer.load.load_file(self.geometries[0]), 1, backend="sweep")
+        banded = py3mf_slicer.slice.slice_model(py3mf_slicer.load.load_file(self.geometries[0]), 1, backend="sweep",
+                                                memory_budget=1000)
+        for key, value in self.stacks(expected)[0].items():
+            np.testing.assert_array_equal(self.stacks(banded)[0][key], value)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.buffers
+import py3mf_slicer.get_items
+
+import numpy as np
+
+
+class TestBuffers(unittest.TestCase):
+
+    def setUp(self):
+        self.geometry1 = os.path.join("tests", "geometries", "test_geometry1.stl")
+
+    def test_mesh_buffers(self):
+        model = py3mf_slicer.load.load_file(self.geometry1)
+        mesh_object = py3mf_slicer.buffers.get_mesh_objects(model)[0]
+        vertices, triangles = py3mf_slicer.buffers.get_mesh_buffers(mesh_object)
+        self.assertEqual(vertices.dtype, np.float32)
+        self.assertEqual(triangles.dtype, np.uint32)
+        expected_vertices = [list(v.Coordinates) for v in mesh_object.GetVertices()]
+        expected_triangles = [list(t.Indices) for t in mesh_object.GetTriangleIndices()]
+        np.testing.assert_array_equal(vertices, expected_vertices)
+        np.testing.assert_array_equal(triangles, expected_triangles)
+
+    def test_slice_stack_buffers(self):
+        model = py3mf_slicer.load.load_file(self.geometry1)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend="sweep")
+        slicestack = py3mf_slicer.buffers.get_slice_stacks(sliced_model)[0]
+        stack = py3mf_slicer.buffers.get_slice_stack_buffers(slicestack)
+        self.assertEqual(len(stack["z"]), slicestack.GetSliceCount())
+        for i in (0, len(stack["z"])-1):
+            slice = slicestack.GetSlice(i)
+            self.assertEqual(stack["z"][i], slice.GetZTop())
+            vertices = stack["vertices"][stack["vertex_offsets"][i]:stack["vertex_offsets"][i+1]]
+            np.testing.assert_array_equal(vertices, [list(v.Coordinates) for v in slice.GetVertices()])
+            first = stack["slice_polygon_offsets"][i]
+            for k in range(slice.GetPolygonCount()):
+                offsets = stack["polygon_offsets"][first+k:first+k+2]
+                self.assertEqual(stack["indices"][offsets[0]:offsets[1]].tolist(), slice.GetPolygonIndices(k))
+
+    def test_vtk_z_tops(self):
+        # plane z values must not be rounded to float32 mesh precision
+        model = py3mf_slicer.load.load_file(self.geometry1)
+        self.assertEqual(py3mf_slicer.get_items.get_pyvista_meshes(model)[0].points.dtype, np.float64)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 0.3)
+        stack = py3mf_slicer.buffers.get_slice_stack_buffers(py3mf_slicer.buffers.get_slice_stacks(sliced_model)[0])
+        self.assertEqual(stack["z"][0], 0.3)
+        self.assertAlmostEqual(py3mf_slicer.get_items.get_layer_height(sliced_model), 0.3, places=12)
+
+    def test_slice_stack_round_trip(self):
+        model = py3mf_slicer.load.load_file(self.geometry1)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend="sweep")
+        stack = py3mf_slicer.buffers.get_slice_stack_buffers(py3mf_slicer.buffers.get_slice_stacks(sliced_model)[0])
+        slicestack = py3mf_slicer.buffers.add_slice_stack_buffers(sliced_model, stack, 0.0)
+        copied = py3mf_slicer.buffers.get_slice_stack_buffers(slicestack)
+        for key, value in stack.items():
+            np.testing.assert_array_equal(copied[key], value)
+
+    def test_py3mf_from_arrays(self):
+        points = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+        triangles = np.array([[0, 2, 1], [0, 1, 3], [1, 1, 2], [0, 3, 2], [1, 2, 3], [3, 3, 3]])
+        model = py3mf_slicer.get_items.get_py3mf_from_arrays([(points, triangles)])
+        vertices, kept = py3mf_slicer.buffers.get_mesh_buffers(py3mf_slicer.buffers.get_mesh_objects(model)[0])
+        np.testing.assert_array_equal(vertices, points)
+        np.testing.assert_array_equal(kept, triangles[[0, 1, 3, 4]])
+
+    def test_py3mf_from_pyvista(self):
+        model = py3mf_slicer.load.load_file(self.geometry1)
+        mesh = py3mf_slicer.get_items.get_pyvista_meshes(model)[0]
+        converted = py3mf_slicer.get_items.get_py3mf_from_pyvista([mesh])
+        expected = py3mf_slicer.buffers.get_mesh_buffers(py3mf_slicer.buffers.get_mesh_objects(model)[0])
+        converted = py3mf_slicer.buffers.get_mesh_buffers(py3mf_slicer.buffers.get_mesh_objects(converted)[0])
+        for array, expected_array in zip(converted, expected):
+            np.testing.assert_array_equal(array, expected_array)
+
+if __name__ == '__main__':
+    unittest.main()
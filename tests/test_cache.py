@@ -0,0 +1,47 @@
+import unittest
+import os
+import tempfile
+import shutil
+import py3mf_slicer
+import py3mf_slicer.cache
+import py3mf_slicer.get_items
+
+import numpy as np
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_cache_hit(self):
+        cache = py3mf_slicer.cache.SliceCache(self.directory)
+        sliced_model = py3mf_slicer.cache.load_and_slice(self.geometries, 1, backend="sweep", cache=cache)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        cached_model = py3mf_slicer.cache.load_and_slice(self.geometries, 1, backend="sweep", cache=cache)
+
+        expected = py3mf_slicer.cache.model_to_arrays(sliced_model)
+        cached = py3mf_slicer.cache.model_to_arrays(cached_model)
+        self.assertEqual(expected.keys(), cached.keys())
+        for key, value in expected.items():
+            np.testing.assert_array_equal(cached[key], value)
+        self.assertEqual(py3mf_slicer.get_items.get_number_layers(cached_model), [24, 19, 16])
+
+    def test_key_depends_on_parameters(self):
+        cache = py3mf_slicer.cache.SliceCache(self.directory)
+        key = cache.key(self.geometries, layer_height=1, backend="sweep")
+        self.assertEqual(key, cache.key(self.geometries, layer_height=1, backend="sweep"))
+        self.assertNotEqual(key, cache.key(self.geometries, layer_height=0.5, backend="sweep"))
+        self.assertNotEqual(key, cache.key(self.geometries[:2], layer_height=1, backend="sweep"))
+
+    def test_eviction(self):
+        cache = py3mf_slicer.cache.SliceCache(self.directory, max_bytes=0)
+        py3mf_slicer.cache.load_and_slice(self.geometries[0], 1, backend="sweep", cache=cache)
+        self.assertEqual(os.listdir(self.directory), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+import shutil
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.columnar
+import py3mf_slicer.buffers
+import py3mf_slicer.index
+import py3mf_slicer.get_items
+
+import numpy as np
+
+
+class TestColumnar(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def sliced_model(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        return py3mf_slicer.slice.slice_model(model, 0.5, backend="sweep")
+
+    def test_round_trip(self):
+        sliced_model = self.sliced_model()
+        py3mf_slicer.columnar.save_slices(sliced_model, self.directory)
+        columns = py3mf_slicer.columnar.load_slices(self.directory)
+        self.assertIsInstance(columns.arrays["vertices"], np.memmap)
+
+        model = columns.to_model()
+        expected = py3mf_slicer.buffers.get_slice_stacks(sliced_model)
+        copied = py3mf_slicer.buffers.get_slice_stacks(model)
+        self.assertEqual(len(copied), 3)
+        for slicestack, copy in zip(expected, copied):
+            self.assertEqual(slicestack.GetBottomZ(), copy.GetBottomZ())
+            stack = py3mf_slicer.buffers.get_slice_stack_buffers(slicestack)
+            for key, value in py3mf_slicer.buffers.get_slice_stack_buffers(copy).items():
+                np.testing.assert_array_equal(value, stack[key])
+
+    def test_to_model_drops_layer_index(self):
+        sliced_model = self.sliced_model()
+        columns = py3mf_slicer.columnar.SliceColumns.from_model(sliced_model)
+        self.assertEqual(len(py3mf_slicer.get_items.get_shapely_slice(sliced_model, 5)), 3)
+        columns.to_model(sliced_model)
+        self.assertEqual(len(py3mf_slicer.get_items.get_shapely_slice(sliced_model, 5)), 6)
+
+    def test_layers_match_layer_index(self):
+        sliced_model = self.sliced_model()
+        py3mf_slicer.columnar.save_slices(sliced_model, self.directory)
+        columns = py3mf_slicer.columnar.load_slices(self.directory)
+        index = py3mf_slicer.index.get_layer_index(sliced_model)
+        np.testing.assert_array_equal(columns.z_table, index.z_table)
+        for layer in (0, 9, len(index.z_table)-1):
+            for buffers, expected in zip(columns.get_layer(layer), index.get_layer(layer)):
+                self.assertEqual(buffers is None, expected is None)
+                if expected is not None:
+                    for array, expected_array in zip(buffers, expected):
+                        np.testing.assert_array_equal(array, expected_array)
+
+if __name__ == '__main__':
+    unittest.main()
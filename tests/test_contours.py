@@ -0,0 +1,69 @@
+import unittest
+import py3mf_slicer
+import py3mf_slicer.contours
+import py3mf_slicer.slice
+
+import numpy as np
+
+
+class TestContours(unittest.TestCase):
+
+    def test_chain_directed(self):
+        # A square 0-1-2-3 and a triangle 4-5-6 with shuffled segments
+        a = np.array([2, 0, 5, 3, 1, 4, 6])
+        b = np.array([3, 1, 6, 0, 2, 5, 4])
+        ring_points, ring_offsets = py3mf_slicer.contours.chain_segments(a, b)
+        self.assertEqual(ring_points.tolist(), [2, 3, 0, 1, 5, 6, 4])
+        self.assertEqual(ring_offsets.tolist(), [0, 4, 7])
+
+    def test_chain_undirected_drops_open_chains(self):
+        # Square with flipped segments plus an open chain 7-8-9
+        a = np.array([0, 2, 2, 0, 7, 8])
+        b = np.array([1, 1, 3, 3, 8, 9])
+        ring_points, ring_offsets = py3mf_slicer.contours.chain_segments(a, b, directed=False)
+        self.assertEqual(ring_offsets.tolist(), [0, 4])
+        self.assertEqual(sorted(ring_points.tolist()), [0, 1, 2, 3])
+
+    def test_assemble_contours_layers(self):
+        square = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=float)
+        starts = np.concatenate((square, square[::-1]*2))
+        ends = np.concatenate((np.roll(square, -1, axis=0), np.roll(square[::-1]*2, -1, axis=0)))
+        layer_ids = np.array([1]*4+[0]*4)
+        vertices, ring_offsets, ring_layers = py3mf_slicer.contours.assemble_contours(layer_ids, starts, ends, directed=False)
+        self.assertEqual(ring_layers.tolist(), [0, 1])
+        areas = py3mf_slicer.contours.ring_areas(vertices, ring_offsets)
+        np.testing.assert_allclose(areas, [4.0, 1.0])
+
+    def test_orient_nested_rings(self):
+        # three nested squares on layer 0, all counter clockwise, and one on layer 1
+        square = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=float)
+        vertices = np.concatenate((square*6, square*4+1, square*2+2, square*4+1))
+        ring_offsets = np.array([0, 4, 8, 12, 16])
+        ring_layers = np.array([0, 0, 0, 1])
+        holes = py3mf_slicer.contours.ring_nesting_odd(vertices, ring_offsets, ring_layers)
+        self.assertEqual(holes.tolist(), [False, True, False, False])
+        ring_points = py3mf_slicer.contours.orient_nested_rings(np.arange(16), ring_offsets, vertices, ring_layers)
+        areas = py3mf_slicer.contours.ring_areas(vertices[ring_points], ring_offsets)
+        np.testing.assert_allclose(areas, [36.0, -16.0, 4.0, 16.0])
+
+    def test_identify_pv_polygons2(self):
+        connections = np.array([[0, 1], [2, 1], [2, 3], [3, 0]])
+        points = np.array([[0, 0], [0, 1], [1, 1], [1, 0]], dtype=float)
+        rings = py3mf_slicer.slice.identify_pv_polygons2(connections, points)
+        self.assertEqual(len(rings), 1)
+        self.assertGreater(py3mf_slicer.contours.ring_areas(points[rings[0]], np.array([0, 4]))[0], 0)
+
+    def test_ring_helpers(self):
+        self.assertEqual(py3mf_slicer.contours.expand_ranges(np.array([5, 0, 2]), np.array([2, 0, 3])).tolist(),
+                         [5, 6, 2, 3, 4])
+        ring_offsets = np.array([0, 3, 5])
+        self.assertEqual(py3mf_slicer.contours.reverse_rings(ring_offsets, np.array([True, False])).tolist(),
+                         [2, 1, 0, 3, 4])
+        # two closed shapely style rings and a missing one in between
+        coordinates = np.array([[0, 0], [1, 0], [0, 1], [0, 0], [5, 5], [6, 5], [5, 6], [5, 5]])
+        vertices, offsets = py3mf_slicer.contours.drop_closing_points(coordinates, np.array([0]*4+[2]*4), 3)
+        self.assertEqual(offsets.tolist(), [0, 3, 3, 6])
+        np.testing.assert_array_equal(vertices, coordinates[[0, 1, 2, 4, 5, 6]])
+
+if __name__ == '__main__':
+    unittest.main()
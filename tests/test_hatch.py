@@ -0,0 +1,50 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.hatch
+
+import numpy as np
+from shapely.geometry import Polygon, MultiLineString
+
+
+class TestHatch(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+        # 10 x 10 square with a 4 x 4 hole
+        self.vertices = np.array([[0, 0], [10, 0], [10, 10], [0, 10], [3, 3], [3, 7], [7, 7], [7, 3]], dtype=float)
+        self.indices = np.arange(8)
+        self.offsets = np.array([0, 4, 8])
+        self.polygon = Polygon(self.vertices[:4], [self.vertices[4:]])
+
+    def test_patterns_fill_slice(self):
+        for pattern in py3mf_slicer.hatch.PATTERNS:
+            for angle in (0, 30, 45):
+                segments = py3mf_slicer.hatch.hatch_slice(self.vertices, self.indices, self.offsets, 0.1, angle=angle,
+                                                          pattern=pattern, cell_size=2.5)
+                lines = MultiLineString(list(segments))
+                # hatch length times spacing approximates the area
+                self.assertAlmostEqual(lines.length*0.1, self.polygon.area, delta=1.0)
+                self.assertLess(lines.difference(self.polygon.buffer(1e-6)).length, 1e-6)
+
+    def test_contour_offset(self):
+        segments = py3mf_slicer.hatch.hatch_slice(self.vertices, self.indices, self.offsets, 0.5, contour_offset=0.5)
+        lines = MultiLineString(list(segments))
+        self.assertLess(lines.difference(self.polygon.buffer(-0.5+1e-6)).length, 1e-6)
+
+    def test_hatch_model(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend="sweep")
+        segments, layer_offsets, stack_ids = py3mf_slicer.hatch.hatch_model(sliced_model, 0.5, pattern="stripes")
+        self.assertEqual(segments.dtype, np.float32)
+        self.assertEqual(len(layer_offsets), 25)
+        self.assertEqual(layer_offsets[-1], len(segments))
+        self.assertEqual(set(stack_ids.tolist()), {0, 1, 2})
+        parallel = py3mf_slicer.hatch.hatch_model(sliced_model, 0.5, pattern="stripes", workers=2, chunk_size=4)
+        for array, expected in zip(parallel, (segments, layer_offsets, stack_ids)):
+            np.testing.assert_array_equal(array, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import py3mf_slicer
+import py3mf_slicer.get_items
+
+from shapely.geometry import Polygon, MultiPolygon, box
+
+
+def square(center, half_size):
+    return box(center-half_size, -half_size, center+half_size, half_size)
+
+
+class TestHierarchy(unittest.TestCase):
+
+    def test_nested_islands(self):
+        # part > hole > island > hole in island, plus a separate part
+        polygons = [square(0, 1), square(20, 2), square(0, 4), square(0, 5), square(0, 3)]
+        geom = py3mf_slicer.get_items.build_hierarchy(polygons)
+        self.assertIsInstance(geom, MultiPolygon)
+        parts = sorted(geom.geoms, key=lambda p: p.area, reverse=True)
+        self.assertEqual([len(p.interiors) for p in parts], [1, 1, 0])
+        self.assertAlmostEqual(geom.area, 100-64+36-4+16)
+
+    def test_touching_hole(self):
+        outer = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)])
+        hole = Polygon([(0, 2), (5, 2), (5, 8), (0, 8)])
+        geom = py3mf_slicer.get_items.build_hierarchy([hole, outer])
+        self.assertIsInstance(geom, Polygon)
+        self.assertEqual(len(geom.interiors), 1)
+
+    def test_empty(self):
+        self.assertIsNone(py3mf_slicer.get_items.build_hierarchy([Polygon()]))
+
+if __name__ == '__main__':
+    unittest.main()
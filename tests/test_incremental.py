@@ -0,0 +1,56 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.incremental
+import py3mf_slicer.transform
+import py3mf_slicer.buffers
+
+import numpy as np
+
+
+class TestIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def stacks(self, model):
+        return [py3mf_slicer.buffers.get_slice_stack_buffers(s) for s in py3mf_slicer.buffers.get_slice_stacks(model)]
+
+    def test_reslice_only_changed(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        slicer = py3mf_slicer.incremental.IncrementalSlicer(0.5, backend="sweep")
+        slicer.reslice(model)
+        self.assertEqual(slicer.dirty, [0, 1, 2])
+        self.assertEqual(slicer.resliced, [0, 1, 2])
+        slicer.reslice(model)
+        self.assertEqual(slicer.dirty, [])
+
+        mesh_object = py3mf_slicer.buffers.get_mesh_objects(model)[1]
+        py3mf_slicer.transform.transform_mesh_object(mesh_object, py3mf_slicer.transform.translation_matrix((0, 0, 2)))
+        py3mf_slicer.transform.transform_build_items(model, 2, py3mf_slicer.transform.translation_matrix((5, 0, 0)))
+        sliced_model = slicer.reslice(model)
+        self.assertEqual(slicer.dirty, [1, 2])
+        self.assertEqual(slicer.resliced, [1])
+
+        expected = py3mf_slicer.slice.slice_model(model, 0.5, backend="sweep")
+        self.assertEqual(len(py3mf_slicer.buffers.get_build_items(sliced_model)), 3)
+        for stack, expected_stack in zip(self.stacks(sliced_model), self.stacks(expected)):
+            for key, value in expected_stack.items():
+                np.testing.assert_array_equal(stack[key], value)
+
+    def test_moving_build_item_reslices_nothing(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        slicer = py3mf_slicer.incremental.IncrementalSlicer(0.5, backend="sweep")
+        before = self.stacks(slicer.reslice(model))
+        py3mf_slicer.transform.transform_build_items(model, 0, py3mf_slicer.transform.translation_matrix((0, 10, 3)))
+        after = self.stacks(slicer.reslice(model))
+        self.assertEqual(slicer.dirty, [0])
+        self.assertEqual(slicer.resliced, [])
+        for stack, expected_stack in zip(after, before):
+            for key, value in expected_stack.items():
+                np.testing.assert_array_equal(stack[key], value)
+
+if __name__ == '__main__':
+    unittest.main()
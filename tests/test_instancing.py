@@ -0,0 +1,46 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.instancing
+import py3mf_slicer.transform
+import py3mf_slicer.buffers
+import py3mf_slicer.get_items
+
+import numpy as np
+
+
+class TestInstancing(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 1, 2, 1)]
+
+    def plate(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        for i, movement in ((1, (30.5, 0, 0)), (3, (0, -42.25, 0))):
+            mesh_object = py3mf_slicer.buffers.get_mesh_objects(model)[i]
+            py3mf_slicer.transform.transform_mesh_object(mesh_object, py3mf_slicer.transform.translation_matrix(movement))
+        return model
+
+    def test_find_instances(self):
+        meshes = [py3mf_slicer.buffers.get_mesh_buffers(m) for m in py3mf_slicer.buffers.get_mesh_objects(self.plate())]
+        representatives, origins = py3mf_slicer.instancing.find_instances(meshes)
+        self.assertEqual(representatives.tolist(), [0, 0, 2, 0])
+        np.testing.assert_allclose(origins[1]-origins[0], (30.5, 0), atol=1e-4)
+
+    def test_instanced_slicing(self):
+        expected = py3mf_slicer.slice.slice_model(self.plate(), 1, backend="sweep")
+        instanced = py3mf_slicer.slice.slice_model(self.plate(), 1, backend="sweep", instancing=True)
+        self.assertEqual(py3mf_slicer.get_items.get_number_layers(instanced),
+                         py3mf_slicer.get_items.get_number_layers(expected))
+        for layer in (0, 10, 18):
+            shapes = py3mf_slicer.get_items.get_shapely_slice(instanced, layer)
+            expected_shapes = py3mf_slicer.get_items.get_shapely_slice(expected, layer)
+            for shape, expected_shape in zip(shapes, expected_shapes):
+                self.assertEqual(shape is None, expected_shape is None)
+                if shape is not None:
+                    self.assertLess(shape.symmetric_difference(expected_shape).area, 1e-3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import json
+import tempfile
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.get_items
+import py3mf_slicer.instrument
+
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def check_report(self, backend, workers=None):
+        events = []
+        instrumentation = py3mf_slicer.instrument.Instrumentation(observer=lambda event, data: events.append(event))
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend=backend, workers=workers,
+                                                      instrumentation=instrumentation)
+        report = instrumentation.report()
+        self.assertIn("slice", report["stages"])
+        self.assertIn("write", report["stages"])
+        self.assertEqual(report["counters"]["stacks"], 3)
+        self.assertEqual(report["counters"]["layers"], sum(py3mf_slicer.get_items.get_number_layers(sliced_model)))
+        self.assertEqual(len(report["layers"]), report["counters"]["layers"])
+        self.assertEqual(sum(layer["rings"] for layer in report["layers"]), report["counters"]["rings"])
+        self.assertTrue(all(layer["segments"] >= layer["vertices"] > 0 for layer in report["layers"]))
+        self.assertEqual(events.count("stack"), 3)
+        return report
+
+    def test_sweep(self):
+        report = self.check_report("sweep")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.json")
+            py3mf_slicer.instrument.Instrumentation().write_report(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["layers"], [])
+
+    def test_vtk_matches_sweep_counts(self):
+        vtk = self.check_report("vtk")
+        sweep = self.check_report("sweep")
+        self.assertEqual(vtk["counters"]["rings"], sweep["counters"]["rings"])
+
+    def test_parallel(self):
+        self.assertEqual(self.check_report("sweep", workers=2)["counters"], self.check_report("sweep")["counters"])
+
+if __name__ == '__main__':
+    unittest.main()
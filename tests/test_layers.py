@@ -0,0 +1,99 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.get_items
+import py3mf_slicer.index
+
+import numpy as np
+import pyvista as pv
+
+
+class TestLayers(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def test_iter_layers(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 0.1, backend="sweep")
+        number_of_layers = py3mf_slicer.get_items.get_number_layers(sliced_model)
+
+        counts = [0]*len(number_of_layers)
+        previous = -1
+        for layer, z, slices in py3mf_slicer.get_items.iter_layers(sliced_model):
+            self.assertEqual(layer, previous+1)
+            previous = layer
+            # Uniform slicing keeps layer i at (i+1)*layer_height
+            self.assertAlmostEqual(z, (layer+1)*0.1, places=6)
+            for i, buffers in enumerate(slices):
+                if buffers is not None:
+                    counts[i] += 1
+        self.assertEqual(counts, number_of_layers, "Every slice should be streamed exactly once")
+
+    def test_get_slices_matches_iter_layers(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1)
+        slices = py3mf_slicer.get_items.get_slices(sliced_model)
+        z_table, _ = py3mf_slicer.get_items.get_z_table(sliced_model)
+        self.assertEqual(len(slices), len(z_table))
+        self.assertEqual([len(s) > 0 for s in slices[4]], [True, True, False])
+        self.assertEqual([len(s) > 0 for s in slices[5]], [True, True, True])
+
+    def boxes_model(self):
+        # 10 mm cubes spanning z 0-20 and 30-40, the second one 15 mm to the side
+        cube = pv.Cube(bounds=(0, 10, 0, 10, 0, 20)).triangulate()
+        triangles = cube.faces.reshape(-1, 4)[:, 1:]
+        return py3mf_slicer.get_items.get_py3mf_from_arrays([(cube.points, triangles),
+                                                             (cube.points*[1, 1, 0.5]+[15, 0, 30], triangles)])
+
+    def test_layer_table_float32_z(self):
+        z = [np.arange(1, 201)*0.1, np.arange(301, 401)*0.1]
+        z_table, stack_layers = py3mf_slicer.index.layer_table([a.astype(np.float32).astype(np.float64) for a in z],
+                                                                0.1)
+        self.assertEqual(len(z_table), 400)
+        np.testing.assert_array_equal(stack_layers[1], np.arange(300, 400))
+
+    def test_layer_gap_vtk(self):
+        sliced_model = py3mf_slicer.slice.slice_model(self.boxes_model(), 0.1)
+        self.assertEqual(py3mf_slicer.get_items.get_shapely_slice(sliced_model, 250), [None, None])
+        self.assertAlmostEqual(py3mf_slicer.get_items.get_layer_z_height(sliced_model, 250), 25.1, places=4)
+        in_gap = py3mf_slicer.get_items.get_shapely_slice(sliced_model, 350)
+        self.assertIsNone(in_gap[0])
+        self.assertAlmostEqual(in_gap[1].area, 100, places=3)
+        self.assertAlmostEqual(py3mf_slicer.get_items.get_layer_z_height(sliced_model, 350), 35.1, places=4)
+
+    def test_layer_index_cache(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1)
+        index = py3mf_slicer.index.get_layer_index(sliced_model)
+        self.assertIs(index, py3mf_slicer.index.get_layer_index(sliced_model))
+        self.assertEqual(index.slice_counts, py3mf_slicer.get_items.get_number_layers(sliced_model))
+        self.assertEqual(index.slice_index(2, 5), 0)
+        self.assertEqual(index.slice_index(2, 4), -1)
+
+        # Slicing again adds stacks and must drop the cached index
+        py3mf_slicer.slice.slice_model(sliced_model, 1)
+        self.assertIsNot(index, py3mf_slicer.index.get_layer_index(sliced_model))
+        self.assertEqual(len(py3mf_slicer.index.get_layer_index(sliced_model).slicestacks), 6)
+
+    def test_merged_pyvista_slices(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1)
+        merged = py3mf_slicer.get_items.get_pyvista_slices(sliced_model, merged=True)
+        separate = py3mf_slicer.get_items.get_pyvista_slices(sliced_model)
+        self.assertEqual(len(merged), 3)
+        for polydata, multiblock in zip(merged, separate):
+            self.assertEqual(polydata.n_cells, sum(block.n_cells for block in multiblock))
+            self.assertEqual(len(np.unique(polydata.cell_data["polygon_id"])), len(multiblock))
+        layers = np.unique(merged[2].cell_data["layer_id"])
+        self.assertEqual(layers[0], 5)
+
+        strided = py3mf_slicer.get_items.get_pyvista_slices(sliced_model, merged=True, layer_stride=4,
+                                                           layer_range=(4, 20), decimate=0.05)
+        self.assertTrue(set(np.unique(strided[0].cell_data["layer_id"])) <= {4, 8, 12, 16})
+        self.assertLessEqual(strided[0].n_points, merged[0].n_points)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import os
+import tempfile
+import shutil
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.write
+import py3mf_slicer.buffers
+
+import numpy as np
+
+
+class TestLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_load_files_merges_buffers(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        mesh_objects = py3mf_slicer.buffers.get_mesh_objects(model)
+        self.assertEqual(len(mesh_objects), 3)
+        for path, mesh_object in zip(self.geometries, mesh_objects):
+            source = py3mf_slicer.buffers.get_mesh_objects(py3mf_slicer.load.load_file(path))[0]
+            for merged, expected in zip(py3mf_slicer.buffers.get_mesh_buffers(mesh_object),
+                                        py3mf_slicer.buffers.get_mesh_buffers(source)):
+                np.testing.assert_array_equal(merged, expected)
+        for build_item in py3mf_slicer.buffers.get_build_items(model):
+            transform = py3mf_slicer.buffers.transform_to_array(build_item.GetObjectTransform())
+            np.testing.assert_array_equal(transform, np.eye(4, 3))
+
+    def test_load_files_keeps_build_transforms(self):
+        source = py3mf_slicer.load.load_file(self.geometries[0])
+        mesh_object = py3mf_slicer.buffers.get_mesh_objects(source)[0]
+        moved = np.eye(4, 3)
+        moved[3] = (10, 20, 0)
+        source.AddBuildItem(mesh_object, py3mf_slicer.buffers.array_to_transform(moved))
+        path = os.path.join(self.directory, "plate.3mf")
+        py3mf_slicer.write.write_file(source, path)
+
+        model = py3mf_slicer.load.load_files([path, self.geometries[1]], workers=2)
+        self.assertEqual(len(py3mf_slicer.buffers.get_mesh_objects(model)), 2)
+        transforms = [py3mf_slicer.buffers.transform_to_array(item.GetObjectTransform())
+                      for item in py3mf_slicer.buffers.get_build_items(model)]
+        self.assertEqual(len(transforms), 3)
+        np.testing.assert_array_equal(transforms[1], moved)
+
+if __name__ == '__main__':
+    unittest.main()
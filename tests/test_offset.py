@@ -0,0 +1,53 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.offset
+import py3mf_slicer.get_items
+import py3mf_slicer.buffers
+import py3mf_slicer.contours
+
+import numpy as np
+
+
+class TestOffset(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def test_offset_model(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend="sweep")
+        distances = (-0.2, 0.1)
+        layer = 10
+        expected = py3mf_slicer.get_items.get_shapely_slice(sliced_model, layer)
+        result = py3mf_slicer.offset.offset_model(sliced_model, distances, write=True)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(len(py3mf_slicer.buffers.get_slice_stacks(sliced_model)), 9)
+
+        shapes = py3mf_slicer.get_items.get_shapely_slice(sliced_model, layer)
+        for d, distance in enumerate(distances):
+            for s, geometry in enumerate(expected):
+                if geometry is None:
+                    continue
+                offset = shapes[3*(d+1)+s]
+                self.assertLess(offset.symmetric_difference(geometry.buffer(distance)).area, 1e-3)
+                self.assertEqual(len(result[d][s]["z"]), len(py3mf_slicer.get_items.get_stack_z(sliced_model)[s]))
+
+    def test_ring_orientation(self):
+        model = py3mf_slicer.load.load_file(self.geometries[0])
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend="sweep")
+        stack = py3mf_slicer.buffers.get_slice_stack_buffers(py3mf_slicer.buffers.get_slice_stacks(sliced_model)[0])
+        grown = py3mf_slicer.offset.offset_stack(stack, [0.5])[0]
+        for i in range(len(grown["z"])):
+            first, last = grown["slice_polygon_offsets"][i:i+2]
+            offsets = grown["polygon_offsets"][first:last+1]
+            vertices = grown["vertices"][grown["vertex_offsets"][i]:grown["vertex_offsets"][i+1]]
+            areas = py3mf_slicer.contours.ring_areas(vertices[grown["indices"][offsets[0]:offsets[-1]]],
+                                                     offsets-offsets[0])
+            # outer contours counter clockwise and larger than any hole
+            self.assertGreater(areas.sum(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.buffers
+
+import numpy as np
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def test_parallel_matches_serial(self):
+        stacks = {}
+        for workers in (None, 2):
+            model = py3mf_slicer.load.load_files(self.geometries)
+            sliced_model = py3mf_slicer.slice.slice_model(model, 0.5, backend="sweep", workers=workers)
+            stacks[workers] = [py3mf_slicer.buffers.get_slice_stack_buffers(s)
+                               for s in py3mf_slicer.buffers.get_slice_stacks(sliced_model)]
+        self.assertEqual(len(stacks[None]), 3)
+        for serial, parallel in zip(stacks[None], stacks[2]):
+            for key, value in serial.items():
+                np.testing.assert_array_equal(parallel[key], value)
+
+    def test_parallel_requires_sweep(self):
+        model = py3mf_slicer.load.load_files(self.geometries[:1])
+        with self.assertRaises(ValueError):
+            py3mf_slicer.slice.slice_model(model, 1, workers=2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+import lib3mf
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.buffers
+import py3mf_slicer.preprocess
+
+import numpy as np
+
+
+class TestPreprocess(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+        model = py3mf_slicer.load.load_file(self.geometries[0])
+        self.vertices, self.triangles = py3mf_slicer.buffers.get_model_mesh_buffers(model)[0]
+        py3mf_slicer.preprocess.clear_cache()
+
+    def soup(self):
+        # one vertex per triangle corner, like an unwelded STL
+        vertices = self.vertices[self.triangles].reshape(-1, 3)
+        # with rounding noise on every third corner
+        vertices[::3] = np.nextafter(vertices[::3], np.float32(np.inf))
+        return vertices, np.arange(len(vertices)).reshape(-1, 3)
+
+    def test_weld_soup(self):
+        vertices, triangles = self.soup()
+        welded, cleaned, report = py3mf_slicer.preprocess.preprocess_mesh(vertices, triangles, tol=1e-4)
+        self.assertEqual(len(welded), len(self.vertices))
+        self.assertEqual(report["vertices_in"], 3*len(self.triangles))
+        self.assertEqual(len(cleaned), len(self.triangles))
+        self.assertTrue(report["watertight"])
+        np.testing.assert_allclose(welded[cleaned], vertices[triangles], atol=1e-4)
+
+    def test_weld_across_cell_borders(self):
+        # vertices 2 and 3 are 0.1*tol apart on both sides of a cell border
+        vertices = np.array([[0.05, 0, 0], [1.95, 0, 0], [0.95, 0, 0], [1.05, 0, 0]])*1e-5
+        welded, remap = py3mf_slicer.preprocess.weld_vertices(vertices, 1e-5)
+        self.assertEqual(remap[2], remap[3])
+        self.assertEqual(len(welded), remap.max()+1)
+        np.testing.assert_array_equal(welded[remap[2]], vertices[min(np.flatnonzero(remap == remap[2]))])
+
+    def test_degenerate_and_duplicate(self):
+        triangles = np.vstack([self.triangles, self.triangles[:3, ::-1], [[0, 0, 1]]])
+        _, cleaned, report = py3mf_slicer.preprocess.preprocess_mesh(self.vertices, triangles)
+        self.assertEqual(report["degenerate"], 1)
+        self.assertEqual(report["duplicate"], 3)
+        np.testing.assert_array_equal(cleaned, self.triangles)
+
+    def test_edge_report(self):
+        # two triangles sharing an edge plus a third on the same edge
+        triangles = np.array([[0, 1, 2], [1, 0, 3], [0, 1, 4]])
+        open_edges, non_manifold = py3mf_slicer.preprocess.edge_report(triangles)
+        np.testing.assert_array_equal(non_manifold, [[0, 1]])
+        self.assertEqual(len(open_edges), 6)
+        _, _, report = py3mf_slicer.preprocess.preprocess_mesh(self.vertices, self.triangles[1:])
+        self.assertEqual(len(report["open_edges"]), 3)
+        self.assertFalse(report["watertight"])
+
+    def test_cache(self):
+        vertices, triangles = self.soup()
+        first = py3mf_slicer.preprocess.preprocess_buffers(vertices, triangles)
+        self.assertIs(py3mf_slicer.preprocess.preprocess_buffers(vertices.copy(), triangles.copy()), first)
+
+    def test_slice_preprocessed(self):
+        wrapper = lib3mf.get_wrapper()
+        model = wrapper.CreateModel()
+        mesh_object = model.AddMeshObject()
+        py3mf_slicer.buffers.set_mesh_buffers(mesh_object, *self.soup())
+        model.AddBuildItem(mesh_object, wrapper.GetIdentityTransform())
+        sliced = py3mf_slicer.slice.slice_model(model, 1, backend="sweep", preprocess=1e-4)
+        vertices, _ = py3mf_slicer.buffers.get_model_mesh_buffers(sliced)[0]
+        self.assertEqual(len(vertices), len(self.vertices))
+        expected = py3mf_slicer.slice.slice_model(py3mf_slicer.load.load_file(self.geometries[0]), 1, backend="sweep")
+        stack, = [py3mf_slicer.buffers.get_slice_stack_buffers(s) for s in py3mf_slicer.buffers.get_slice_stacks(sliced)]
+        expected, = [py3mf_slicer.buffers.get_slice_stack_buffers(s)
+                     for s in py3mf_slicer.buffers.get_slice_stacks(expected)]
+        np.testing.assert_array_equal(stack["slice_polygon_offsets"], expected["slice_polygon_offsets"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+import tempfile
+import shutil
+import zlib
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.index
+import py3mf_slicer.visualize
+
+import numpy as np
+
+
+class TestPreview(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def sliced_model(self):
+        return py3mf_slicer.slice.slice_model(py3mf_slicer.load.load_files(self.geometries), 1, backend="sweep")
+
+    def test_preview_camera(self):
+        position, focal_point, view_up, scale = py3mf_slicer.visualize.preview_camera((0, 40, 10, 20), (400, 200),
+                                                                                      margin=0)
+        self.assertEqual(focal_point, (20, 15, 0))
+        self.assertEqual(position[:2], focal_point[:2])
+        # 40 wide in a 2:1 image needs a half height of 10
+        self.assertAlmostEqual(scale, 10)
+
+    def test_layer_preview_polydata(self):
+        index = py3mf_slicer.index.get_layer_index(self.sliced_model())
+        slices = [(s, buffers) for s, buffers in enumerate(index.get_layer(10)) if buffers is not None]
+        polydata = py3mf_slicer.visualize.layer_preview_polydata(slices)
+        self.assertEqual(set(np.unique(polydata.cell_data["stack"])), {0, 1, 2})
+        self.assertEqual(polydata.n_cells, sum(len(buffers[1]) for _, buffers in slices))
+        self.assertTrue(np.all(polydata.points[:, 2] == 0))
+
+    def read_png(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        width, height = int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+        start = data.index(b"IDAT")
+        length = int.from_bytes(data[start-4:start], "big")
+        raw = np.frombuffer(zlib.decompress(data[start+4:start+4+length]), dtype=np.uint8)
+        return raw.reshape(height, -1)[:, 1:].reshape(height, width, 3)
+
+    def test_preview_grid(self):
+        camera = py3mf_slicer.visualize.preview_camera((0, 40, 10, 20), (400, 200), margin=0)
+        grid = py3mf_slicer.visualize.preview_grid(camera, (400, 200))
+        self.assertEqual(grid.shape, (200, 400))
+        np.testing.assert_allclose(grid.origin, (0, 5))
+        self.assertAlmostEqual(grid.pixel_size, 0.1)
+
+    def test_raster_previews(self):
+        # runs headless, "auto" falls back to the raster renderer without OpenGL
+        sliced_model = self.sliced_model()
+        paths = py3mf_slicer.visualize.render_layer_previews(sliced_model, self.directory, layers=[5, 10],
+                                                             resolution=(96, 64), workers=1, renderer="raster")
+        self.assertEqual([os.path.basename(p) for p in paths], ["layer_00005.png", "layer_00010.png"])
+        image = self.read_png(paths[1])
+        self.assertEqual(image.shape, (64, 96, 3))
+        colors = {tuple(c) for c in image.reshape(-1, 3)}
+        self.assertIn((255, 255, 255), colors)
+        for color in py3mf_slicer.visualize.PREVIEW_COLORS[:3]:
+            self.assertIn(tuple(int(color[i:i+2], 16) for i in (1, 3, 5)), colors)
+
+        pooled = py3mf_slicer.visualize.render_layer_previews(sliced_model, os.path.join(self.directory, "pool"),
+                                                              layers=[5, 10], resolution=(96, 64), workers=2,
+                                                              chunk_size=1)
+        if not py3mf_slicer.visualize.offscreen_rendering_available():
+            np.testing.assert_array_equal(self.read_png(pooled[1]), image)
+
+    @unittest.skipIf(py3mf_slicer.visualize.offscreen_rendering_available(), "OpenGL rendering is available")
+    def test_vtk_previews_without_opengl(self):
+        with self.assertRaises(RuntimeError):
+            py3mf_slicer.visualize.render_layer_previews(self.sliced_model(), self.directory, renderer="vtk")
+
+    @unittest.skipUnless(py3mf_slicer.visualize.offscreen_rendering_available(), "needs OpenGL rendering")
+    def test_render_layer_previews(self):
+        paths = py3mf_slicer.visualize.render_layer_previews(self.sliced_model(), self.directory, layers=[0, 5, 10],
+                                                             resolution=(64, 64), workers=1, renderer="vtk")
+        self.assertEqual([os.path.basename(p) for p in paths], ["layer_00000.png", "layer_00005.png", "layer_00010.png"])
+        self.assertTrue(all(os.path.getsize(p) > 0 for p in paths))
+
+if __name__ == '__main__':
+    unittest.main()
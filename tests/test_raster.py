@@ -0,0 +1,84 @@
+import unittest
+import os
+import zlib
+import tempfile
+import shutil
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.get_items
+import py3mf_slicer.raster
+from py3mf_slicer.raster import RasterGrid
+
+import numpy as np
+from shapely.geometry import Polygon
+
+
+class TestRaster(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+        # 10 x 10 square with a 4 x 4 hole
+        self.vertices = np.array([[0, 0], [10, 0], [10, 10], [0, 10], [3, 3], [3, 7], [7, 7], [7, 3]], dtype=float)
+        self.indices = np.arange(8)
+        self.offsets = np.array([0, 4, 8])
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_even_odd_fill(self):
+        grid = RasterGrid.from_bounds((0, 10, 0, 10), 0.5)
+        image = py3mf_slicer.raster.rasterize_slices([(self.vertices, self.indices, self.offsets)], grid)
+        self.assertEqual(image.shape, (20, 20))
+        self.assertEqual((image == 255).sum(), 400-64)
+        self.assertTrue(np.all(image[6:14, 6:14] == 0))
+
+    def test_supersample(self):
+        # a square with its edges on pixel centers is half covered along them
+        vertices = np.array([[0.5, 0.5], [3.5, 0.5], [3.5, 3.5], [0.5, 3.5]])
+        grid = RasterGrid((0, 0), (4, 4), 1.0)
+        image = py3mf_slicer.raster.rasterize_slices([(vertices, np.arange(4), np.array([0, 4]))], grid, supersample=4)
+        self.assertEqual(image[1, 1], 255)
+        self.assertEqual(image[1, 0], 128)
+        self.assertEqual(image[0, 0], 64)
+        self.assertAlmostEqual(image.sum()/255, 9, delta=0.1)
+
+    def test_top_row_is_top(self):
+        vertices = np.array([[0, 2], [4, 2], [4, 4], [0, 4]], dtype=float)
+        image = py3mf_slicer.raster.rasterize_slices([(vertices, np.arange(4), np.array([0, 4]))],
+                                                     RasterGrid((0, 0), (4, 4), 1.0))
+        self.assertTrue(np.all(image[:2] == 255))
+        self.assertTrue(np.all(image[2:] == 0))
+
+    def test_write_png(self):
+        image = (np.arange(12, dtype=np.uint8)*20).reshape(3, 4)
+        path = os.path.join(self.directory, "image.png")
+        py3mf_slicer.raster.write_png(path, image)
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+        start = data.index(b"IDAT")
+        length = int.from_bytes(data[start-4:start], "big")
+        raw = np.frombuffer(zlib.decompress(data[start+4:start+4+length]), dtype=np.uint8).reshape(3, 5)
+        np.testing.assert_array_equal(raw[:, 1:], image)
+
+    def test_rasterize_model(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend="sweep")
+        images, grid = py3mf_slicer.raster.rasterize_model(sliced_model, 0.25, supersample=2)
+        self.assertEqual(images.shape, (24,)+grid.shape)
+        # filled area matches the slice polygons
+        polygons = py3mf_slicer.get_items.get_shapely_slice(sliced_model, 10)
+        area = sum(p.area for p in polygons if p is not None)
+        self.assertAlmostEqual(images[10].sum()/255*0.25**2, area, delta=0.02*area)
+
+        out = os.path.join(self.directory, "layers.npy")
+        mapped, _ = py3mf_slicer.raster.rasterize_model(sliced_model, 0.25, supersample=2, out=out,
+                                                        directory=self.directory, workers=2, chunk_size=8)
+        np.testing.assert_array_equal(mapped, images)
+        np.testing.assert_array_equal(np.load(out), images)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "layer_00023.png")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.slice
+import py3mf_slicer.get_items
+import py3mf_slicer.sweep
+import py3mf_slicer.buffers
+import py3mf_slicer.contours
+
+import numpy as np
+import pyvista as pv
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def test_sweep_slice_cube(self):
+        cube = pv.Cube(center=(0, 0, 0), x_length=2, y_length=2, z_length=2).triangulate()
+        triangles = cube.faces.reshape(-1, 4)[:, 1:]
+        layer_ids, starts, ends = py3mf_slicer.sweep.sweep_slice(cube.points, triangles, [-0.5, 0.5, 2.0])
+        self.assertEqual(set(layer_ids.tolist()), {0, 1}, "Only planes inside the cube should be cut")
+        # Outer contours run counter clockwise around the cube axis
+        self.assertTrue(np.all(starts[:, 0]*ends[:, 1] - starts[:, 1]*ends[:, 0] > 0))
+        self.assertAlmostEqual(np.linalg.norm(ends - starts, axis=1).sum(), 16.0, places=5)
+
+    def test_backends_agree(self):
+        areas = {}
+        for backend in ("vtk", "sweep"):
+            model = py3mf_slicer.load.load_files(self.geometries)
+            sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend=backend)
+            number_of_layers = py3mf_slicer.get_items.get_number_layers(sliced_model)
+            areas[backend] = []
+            for i in range(max(number_of_layers)):
+                shapes = py3mf_slicer.get_items.get_shapely_slice(sliced_model, i)
+                areas[backend].append([0.0 if s is None else s.area for s in shapes])
+        np.testing.assert_allclose(areas["vtk"], areas["sweep"], rtol=1e-5)
+
+    def test_backends_agree_on_winding(self):
+        # a tube: every layer has an outer contour and a hole
+        tube = pv.Disc(inner=2, outer=5, r_res=1, c_res=48).extrude((0, 0, 10), capping=True).triangulate().clean()
+        tube = tube.compute_normals(auto_orient_normals=True)
+        areas = {}
+        for backend in ("vtk", "sweep"):
+            model = py3mf_slicer.get_items.get_py3mf_from_arrays([(tube.points, tube.faces.reshape(-1, 4)[:, 1:])])
+            sliced_model = py3mf_slicer.slice.slice_model(model, 1, backend=backend)
+            stack = py3mf_slicer.buffers.get_slice_stack_buffers(py3mf_slicer.buffers.get_slice_stacks(sliced_model)[0])
+            areas[backend] = []
+            for layer in range(len(stack["z"])):
+                vertices = stack["vertices"][stack["vertex_offsets"][layer]:stack["vertex_offsets"][layer+1]]
+                rings = stack["polygon_offsets"][stack["slice_polygon_offsets"][layer]:stack["slice_polygon_offsets"][layer+1]+1]
+                ring_vertices = vertices[stack["indices"][rings[0]:rings[-1]]]
+                areas[backend].append(sorted(py3mf_slicer.contours.ring_areas(ring_vertices, rings-rings[0])))
+        self.assertEqual(len(areas["vtk"]), 9)
+        # the hole runs clockwise in both backends
+        self.assertTrue(all(layer[0] < 0 < layer[1] for layer in areas["sweep"]))
+        np.testing.assert_allclose(areas["vtk"], areas["sweep"], rtol=1e-5)
+
+    def test_unknown_backend(self):
+        model = py3mf_slicer.load.load_files(self.geometries[:1])
+        with self.assertRaises(ValueError):
+            py3mf_slicer.slice.slice_model(model, 1, backend="unknown")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import os
+import py3mf_slicer
+import py3mf_slicer.load
+import py3mf_slicer.transform
+import py3mf_slicer.buffers
+import py3mf_slicer.get_items
+
+import numpy as np
+
+
+class TestTransform(unittest.TestCase):
+
+    def setUp(self):
+        self.geometries = [os.path.join("tests", "geometries", f"test_geometry{i}.stl") for i in (1, 2, 3)]
+
+    def test_matrix_matches_pyvista(self):
+        model = py3mf_slicer.load.load_file(self.geometries[0])
+        mesh = py3mf_slicer.get_items.get_pyvista_meshes(model)[0]
+        expected = mesh.translate([1, 2, 3]).rotate_x(30).rotate_y(45).rotate_z(60).scale([1, 2, 0.5])
+        matrix = py3mf_slicer.transform.get_matrix((1, 2, 3), (30, 45, 60), (1, 2, 0.5))
+        np.testing.assert_allclose(py3mf_slicer.transform.transform_vertices(mesh.points, matrix), expected.points,
+                                   atol=1e-4)
+
+    def test_transform_build_items(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        moves = [py3mf_slicer.transform.translation_matrix((10*i, 0, 0)) for i in range(3)]
+        py3mf_slicer.transform.transform_build_items(model, [0, 1, 2], moves)
+        py3mf_slicer.transform.transform_build_items(model, 2, py3mf_slicer.transform.scale_matrix((2, 2, 2)))
+        transforms = [py3mf_slicer.buffers.transform_to_array(item.GetObjectTransform())
+                      for item in py3mf_slicer.buffers.get_build_items(model)]
+        np.testing.assert_allclose(transforms[1], moves[1])
+        np.testing.assert_allclose(transforms[2][3], (40, 0, 0))
+        np.testing.assert_allclose(transforms[2][:3], 2*np.eye(3))
+
+    def test_transform_mesh_object(self):
+        model = py3mf_slicer.load.load_file(self.geometries[0])
+        mesh_object = py3mf_slicer.buffers.get_mesh_objects(model)[0]
+        vertices, triangles = py3mf_slicer.buffers.get_mesh_buffers(mesh_object)
+        py3mf_slicer.transform.transform_mesh_object(mesh_object, py3mf_slicer.transform.scale_matrix((-1, 1, 1)))
+        mirrored, flipped = py3mf_slicer.buffers.get_mesh_buffers(mesh_object)
+        np.testing.assert_allclose(mirrored[:, 0], -vertices[:, 0])
+        np.testing.assert_array_equal(flipped, triangles[:, ::-1])
+
+    def test_transform_model(self):
+        model = py3mf_slicer.load.load_files(self.geometries)
+        transformed = py3mf_slicer.transform.transform_model(model, 1, movement=(5, 0, 0))
+        before = py3mf_slicer.get_items.get_bounding_boxes(model)
+        after = py3mf_slicer.get_items.get_bounding_boxes(transformed)
+        np.testing.assert_allclose(np.array(after[1])-np.array(before[1]), [[5, 0, 0], [5, 0, 0]], atol=1e-5)
+        np.testing.assert_allclose(after[0], before[0])
+
+if __name__ == '__main__':
+    unittest.main()